@@ -0,0 +1,81 @@
+# bench_analysis_cache.py - symptom analysis with and without the analysis cache
+#
+# Replays a synthetic message log (comma lists and free text over the symptom
+# vocabulary, like bench_triage) through analyze_symptoms, triage and
+# generate_response, once with the cache disabled (maxsize 0) and once with
+# it warmed by precompute_analyses. Reports time per call and the peak bytes
+# allocated inside a call (tracemalloc, measured in a separate pass).
+# Usage: python benchmarks/bench_analysis_cache.py [--messages N] [--repeat N]
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.cache import AnalysisCache  # noqa: E402
+from healthai.chatbot import HealthcareChatbot  # noqa: E402
+
+FILLER = ["i have had", "since yesterday", "and also", "really bad", "my kid has", "what should i do"]
+
+
+def synthetic_messages(n, vocab, seed=0):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        symptoms = rng.sample(vocab, rng.randint(1, 3))
+        if rng.random() < 0.5:
+            out.append(", ".join(symptoms))
+        else:
+            out.append(" ".join([rng.choice(FILLER)] + [f"{s} {rng.choice(FILLER)}" for s in symptoms]))
+    return out
+
+
+def run(fn, messages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for m in messages:
+            fn(m)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    peak_total = 0
+    for m in messages:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(m)
+        peak_total += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    n = len(messages)
+    return best / n * 1e6, peak_total / n
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--messages", type=int, default=20_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    uncached = HealthcareChatbot()
+    uncached.analysis_cache = AnalysisCache(maxsize=0)
+    cached = HealthcareChatbot()
+    precomputed = cached.precompute_analyses()
+    messages = synthetic_messages(args.messages, cached.symptom_list)
+
+    print(f"{args.messages:,} messages, {precomputed} analyses precomputed")
+    print(f"{'call':<20} {'cache':<6} {'us/call':>9} {'peak B/call':>12}")
+    for name in ("analyze_symptoms", "triage", "generate_response"):
+        results = {}
+        for label, bot in (("off", uncached), ("on", cached)):
+            us, peak = results[label] = run(getattr(bot, name), messages, args.repeat)
+            print(f"{name:<20} {label:<6} {us:>9.2f} {peak:>12,.0f}")
+        (us_off, peak_off), (us_on, peak_on) = results["off"], results["on"]
+        print(f"{'':<20} {'':<6} {us_off / us_on:>8.2f}x {peak_off / max(peak_on, 1):>11.2f}x")
+    stats = cached.analysis_cache.stats()
+    print(f"cache: {stats['size']} entries, hit rate {stats['hit_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
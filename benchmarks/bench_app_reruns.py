@@ -0,0 +1,123 @@
+# bench_app_reruns.py - how often, and how expensively, the Streamlit app reruns
+#
+# Drives app.py headlessly with streamlit's AppTest (no browser, no server):
+#   - rerun cost per page: wall and CPU time of one full script run with the
+#     page open (what every widget interaction outside a form pays),
+#   - simulated sessions: a user filling in the predictor's 13 inputs and
+#     submitting, and one typing a symptom list and analyzing it. A widget
+#     outside a form reruns the script when it changes; one inside a form
+#     only sends its value with the submit, so it costs nothing until then.
+# Compare against an older app.py with --app, e.g.
+#   git show HEAD~1:app.py > /tmp/app_old.py
+#   python benchmarks/bench_app_reruns.py --app /tmp/app_old.py
+# Usage: python benchmarks/bench_app_reruns.py [--app PATH] [--runs N]
+import argparse
+import os
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+PAGES = ["📊 Main Dashboard", "💬 Medical Chatbot", "🩺 Symptom Checker", "💊 Medication Info",
+         "❤️ Heart Disease Predictor"]
+PATIENT = {"Age": 63, "Sex": "Male", "Chest Pain Type": "Asymptomatic", "Resting Blood Pressure (mm Hg)": 145,
+           "Serum Cholesterol (mg/dl)": 233, "Fasting Blood Sugar > 120 mg/dl": "Yes",
+           "Resting ECG Results": "Normal", "Max Heart Rate Achieved": 150, "Exercise Induced Angina": "No",
+           "ST Depression (exercise)": 2.3, "Slope of Peak Exercise ST Segment": "Downsloping",
+           "Number of Major Vessels Colored": 0, "Thalassemia": "Fixed defect"}
+
+
+class Session:
+    """One AppTest session that counts and times the reruns it triggers."""
+
+    def __init__(self, app):
+        self.at = AppTest.from_file(app, default_timeout=120)
+        self.reruns = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.run()
+
+    def run(self):
+        wall, cpu = time.perf_counter(), time.process_time()
+        self.at.run()
+        self.wall += time.perf_counter() - wall
+        self.cpu += time.process_time() - cpu
+        self.reruns += 1
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+
+    def open(self, page):
+        self.at.sidebar.selectbox[0].set_value(page)
+        self.run()
+        self.reset()
+
+    def reset(self):
+        self.reruns, self.wall, self.cpu = 0, 0.0, 0.0
+
+    def set(self, widget, value):
+        """Change a widget the way a browser would: outside a form that is
+        a rerun, inside one it waits for the submit."""
+        widget.set_value(value)
+        if not getattr(widget, "form_id", ""):
+            self.run()
+
+    def click(self, label):
+        buttons = [b for b in list(self.at.button) + list(self.at.get("form_submit_button")) if b.label == label]
+        buttons[0].click()
+        self.run()
+
+
+def main_widgets(at, label):
+    for kind in ("slider", "radio", "selectbox", "text_area", "text_input"):
+        for widget in getattr(at.main, kind):
+            if widget.label == label:
+                return widget
+    raise KeyError(label)
+
+
+def fill_patient(session):
+    for label, value in PATIENT.items():
+        widget = main_widgets(session.at, label)
+        if widget.type == "selectbox" and value not in widget.options:
+            value = widget.options[-1]
+        if widget.type == "radio" and value not in widget.options:
+            value = widget.options[0]
+        session.set(widget, value)
+    session.click("🔍 Predict Heart Disease Risk")
+
+
+def check_symptoms(session):
+    session.set(main_widgets(session.at, "Describe your symptoms (free text or comma-separated):"),
+                "fever, cough, chest pain")
+    session.click("Analyze Symptoms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    ap.add_argument("--runs", type=int, default=10, help="reruns timed per page")
+    args = ap.parse_args()
+    warnings.simplefilter("ignore")
+
+    session = Session(args.app)
+    print(f"app: {args.app}")
+    print(f"{'page':<28} {'wall ms/rerun':>14} {'cpu ms/rerun':>13}")
+    for page in PAGES:
+        session.open(page)
+        for _ in range(args.runs):
+            session.run()
+        print(f"{page:<28} {session.wall / args.runs * 1e3:>14.1f} {session.cpu / args.runs * 1e3:>13.1f}")
+
+    print(f"\n{'session':<28} {'reruns':>7} {'wall ms':>9} {'cpu ms':>9}")
+    for page, scenario in (("❤️ Heart Disease Predictor", fill_patient), ("🩺 Symptom Checker", check_symptoms)):
+        session.open(page)
+        scenario(session)
+        print(f"{scenario.__name__:<28} {session.reruns:>7} {session.wall * 1e3:>9.1f} {session.cpu * 1e3:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench_chat_render.py - chat page render time vs session length
+#
+# Runs two minimal Streamlit scripts under AppTest: the old page (one
+# st.markdown call per stored message, unbounded list of dicts) and the
+# ChatHistory page (last --window turns as one HTML block). Both get the same
+# pre-filled session so only rendering is measured.
+# Usage: python benchmarks/bench_chat_render.py [--turns 10 100 1000 5000]
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from healthai.history import ChatHistory  # noqa: E402
+
+LEGACY_PAGE = """
+import streamlit as st
+for msg in st.session_state.chat_history:
+    css = "user-message" if msg["type"] == "user" else "bot-message"
+    st.markdown(f"<div class='{css}'>{msg['content']}</div>", unsafe_allow_html=True)
+"""
+
+WINDOWED_PAGE = """
+import streamlit as st
+history = st.session_state.chat_history
+st.markdown(f"<div class='chat-container'>{history.render_html(st.session_state.chat_window)}</div>",
+            unsafe_allow_html=True)
+"""
+
+USER = "I have had a fever and a cough since yesterday, what should I do?"
+BOT = ("**Urgency:** URGENT\n\nUrgent: Respiratory infection (flu, pneumonia, COVID-19). "
+       "Consult healthcare professional soon.\n\n**Recommendations:**\n- Monitor temperature regularly")
+
+
+def legacy_history(turns):
+    out = []
+    for i in range(turns):
+        out.append({"type": "user" if i % 2 == 0 else "bot", "content": USER if i % 2 == 0 else BOT,
+                    "ts": "2025-01-01T00:00:00"})
+    return out
+
+
+def windowed_history(turns, capacity):
+    history = ChatHistory(capacity=capacity)
+    for i in range(turns):
+        history.append("user" if i % 2 == 0 else "bot", USER if i % 2 == 0 else BOT)
+    return history
+
+
+def time_page(script, state, runs):
+    at = AppTest.from_string(script, default_timeout=120)
+    for key, value in state.items():
+        at.session_state[key] = value
+    at.run()   # warm-up (first run compiles the script)
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1e3
+
+
+def size_of(build):
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size / 1024
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare chat page rerun cost as the session grows.")
+    ap.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1_000, 5_000])
+    ap.add_argument("--window", type=int, default=20)
+    ap.add_argument("--capacity", type=int, default=200)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'turns':>7} | {'legacy ms':>10} {'legacy KiB':>11} | {'window ms':>10} {'in-memory KiB':>14}")
+    for n in args.turns:
+        legacy, legacy_kib = size_of(lambda: legacy_history(n))
+        history, history_kib = size_of(lambda: windowed_history(n, args.capacity))
+        legacy_ms = time_page(LEGACY_PAGE, {"chat_history": legacy}, args.runs)
+        window_ms = time_page(WINDOWED_PAGE, {"chat_history": history, "chat_window": args.window}, args.runs)
+        print(f"{n:>7,} | {legacy_ms:>10.1f} {legacy_kib:>11.0f} | {window_ms:>10.1f} {history_kib:>14.0f}")
+        history.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench_drug_index.py - DrugIndex lookups on a synthetic 50k-entry formulary
+#
+# Compares the indexed lookups with the linear scans the chatbot used before
+# (``q in k`` over every key) and checks that they agree.
+# Usage: python benchmarks/bench_drug_index.py [--drugs 50000]
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.drugs import DrugIndex  # noqa: E402
+
+SYLLABLES = ["pra", "zo", "lam", "ci", "tor", "va", "met", "for", "min", "lo", "sar", "tan",
+             "pine", "dol", "ox", "cil", "lin", "ami", "des", "tri", "fen", "nol", "rel", "ban"]
+
+
+def make_formulary(rng, n):
+    names, aliases = set(), {}
+    while len(names) < n:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 5))))
+    names = sorted(names)
+    rng.shuffle(names)
+    for name in names[: n // 2]:
+        aliases[name[::-1] + rng.choice(["ex", "ol", "um"])] = name
+    return names, aliases
+
+
+def misspell(rng, word):
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice("aeiou") + word[i + 1:]
+
+
+def timed(fn, queries):
+    lat = np.empty(len(queries))
+    for i, q in enumerate(queries):
+        t0 = time.perf_counter()
+        fn(q)
+        lat[i] = time.perf_counter() - t0
+    return lat * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark drug-name lookups at formulary scale.")
+    ap.add_argument("--drugs", type=int, default=50_000)
+    ap.add_argument("--queries", type=int, default=500)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    names, aliases = make_formulary(rng, args.drugs)
+    t0 = time.perf_counter()
+    index = DrugIndex(names, aliases)
+    index.prefix("a")  # force the build
+    print(f"{len(names):,} drugs + {len(aliases):,} aliases, index built in {time.perf_counter() - t0:.2f}s")
+
+    keys = list(names) + list(aliases)
+    sample = [rng.choice(names) for _ in range(args.queries)]
+    fragments = [n[1:6] for n in sample]
+    chat = [f"can i take {n} together with my usual tablets after dinner?" for n in sample]
+
+    def linear_substring(q):
+        return {aliases.get(k, k) for k in keys if q in k}
+
+    for q in fragments[:50]:
+        assert set(index.substring(q)) == linear_substring(q), q
+        assert set(index.substring(q, aliases=False)) == {n for n in names if q in n}, q
+
+    t0 = time.perf_counter()
+    index.find_in_text("")  # the text matcher is built on first use, apart from the index
+    print(f"text matcher built in {time.perf_counter() - t0:.2f}s")
+
+    cases = [
+        ("exact", index.exact, sample),
+        ("prefix", lambda q: index.prefix(q[:4]), sample),
+        ("substring", index.substring, fragments),
+        ("fuzzy", index.fuzzy, [misspell(rng, n) for n in sample]),
+        ("detect in chat", index.find_in_text, chat),
+        ("linear substring", linear_substring, fragments[:50]),
+    ]
+    print(f"{'lookup':>18} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, fn, queries in cases:
+        p50, p99 = np.percentile(timed(fn, queries), [50, 99])
+        print(f"{name:>18} {p50:>9.4f} {p99:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# bench_explain.py - cost of per-patient explanations, per row and per cohort
+#
+# Three ways to attribute a patient's risk to the 13 inputs:
+#   - perturbation, row by row: replace each feature with the cohort mean and
+#     rescore, one predict_proba call per perturbed row (how a naive loop
+#     would do it),
+#   - perturbation, batched: all 13 perturbed copies of every row scored in
+#     one predict_proba call per chunk,
+#   - path attribution (ForestExplainer): one vectorized walk over the trees.
+# Usage: python benchmarks/bench_explain.py [--rows N] [--loop-rows N]
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.batch import score_array  # noqa: E402
+from healthai.explain import ForestExplainer  # noqa: E402
+from healthai.model import load_model  # noqa: E402
+from bench_parallel_scaling import synthetic_features  # noqa: E402
+
+
+def perturbation_loop(model, X, background):
+    out = np.empty_like(X)
+    for i, row in enumerate(X):
+        base = score_array(model, row[None, :])[1][0, 1]
+        for j in range(X.shape[1]):
+            perturbed = row.copy()
+            perturbed[j] = background[j]
+            out[i, j] = base - score_array(model, perturbed[None, :])[1][0, 1]
+    return out
+
+
+def perturbation_batched(model, X, background, chunk=2_000):
+    n_features = X.shape[1]
+    out = np.empty_like(X)
+    for start in range(0, len(X), chunk):
+        block = X[start:start + chunk]
+        perturbed = np.repeat(block, n_features + 1, axis=0).reshape(len(block), n_features + 1, n_features)
+        idx = np.arange(n_features)
+        perturbed[:, idx + 1, idx] = background
+        proba = score_array(model, perturbed.reshape(-1, n_features))[1][:, 1].reshape(len(block), n_features + 1)
+        out[start:start + chunk] = proba[:, :1] - proba[:, 1:]
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=20_000, help="cohort size for the batched methods")
+    ap.add_argument("--loop-rows", type=int, default=20, help="rows timed with the per-row loop")
+    args = ap.parse_args()
+    warnings.simplefilter("ignore")
+
+    model, name = load_model(None, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if model is None:
+        sys.exit("no model file found")
+    X = synthetic_features(args.rows, seed=3)
+    background = X.mean(axis=0)
+
+    t0 = time.perf_counter()
+    explainer = ForestExplainer(model)
+    build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    perturbation_loop(model, X[:args.loop_rows], background)
+    loop = (time.perf_counter() - t0) / args.loop_rows
+
+    t0 = time.perf_counter()
+    perturbation_batched(model, X, background)
+    batched = (time.perf_counter() - t0) / args.rows
+
+    t0 = time.perf_counter()
+    explainer.contributions(X)
+    path = (time.perf_counter() - t0) / args.rows
+
+    t0 = time.perf_counter()
+    for row in X[:200]:
+        explainer.explain(row)
+    single = (time.perf_counter() - t0) / 200
+
+    print(f"model {name}: {explainer.forest.n_trees} trees, explainer built in {build * 1e3:.1f} ms")
+    print(f"{'method':<34} {'ms/row':>10} {'rows/s':>12} {'100k cohort':>12}")
+    for label, per_row in (("perturbation, one call per row", loop), ("perturbation, batched", batched),
+                           ("path attribution, batched", path), ("path attribution, single row", single)):
+        print(f"{label:<34} {per_row * 1e3:>10.3f} {1 / per_row:>12,.0f} {per_row * 100_000:>10.1f} s")
+
+
+if __name__ == "__main__":
+    main()
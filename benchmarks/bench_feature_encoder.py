@@ -0,0 +1,110 @@
+# bench_feature_encoder.py - feature encoding cost next to the inference it feeds
+#
+# Single record: the predictor's form values encoded with list.index and
+# wrapped in a one-row DataFrame (the old predict_risk path) vs
+# HeartFeatureEncoder.encode_values fed to the model as a plain array.
+# Batch: a synthetic extract with UI labels in the categorical columns,
+# encoded with the old per-column pandas code vs encode_columns into a
+# preallocated buffer, each next to the time predict_proba takes on it.
+# Usage: python benchmarks/bench_feature_encoder.py [--rows N] [--repeat N]
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.encoder import get_encoder  # noqa: E402
+from healthai.forest import compile_forest  # noqa: E402
+from healthai.model import FEATURE_NAMES, FEATURE_SCHEMA, load_model  # noqa: E402
+from bench_parallel_scaling import synthetic_features  # noqa: E402
+
+FORM = (63, "Male", "Asymptomatic", 145, 233, "Yes", "Normal", 150, "No", 2.3, "Downsloping", 0, "Fixed defect")
+OPTIONS = {name: options for name, options, _, _ in FEATURE_SCHEMA if options is not None}
+
+
+def legacy_encode_values(values):
+    return [OPTIONS[name].index(v) if name in OPTIONS else v for name, v in zip(FEATURE_NAMES, values)]
+
+
+def legacy_encode_frame(df):
+    X = np.empty((len(df), len(FEATURE_NAMES)), dtype=np.float64)
+    for j, name in enumerate(FEATURE_NAMES):
+        column = df[name]
+        if name not in OPTIONS or pd.api.types.is_numeric_dtype(column):
+            X[:, j] = pd.to_numeric(column, errors='raise').to_numpy(dtype=np.float64)
+        else:
+            labels = column.astype(str).str.strip()
+            X[:, j] = pd.Categorical(labels, categories=OPTIONS[name]).codes
+    return X
+
+
+def best(fn, repeat, number=1):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - t0) / number)
+    return min(times)
+
+
+def labelled_frame(n):
+    X = synthetic_features(n, seed=4)
+    columns = {}
+    for j, name in enumerate(FEATURE_NAMES):
+        if name in OPTIONS:
+            labels = np.array(OPTIONS[name], dtype=object)
+            columns[name] = labels[np.minimum(X[:, j].astype(int), len(labels) - 1)]
+        else:
+            columns[name] = X[:, j]
+    return pd.DataFrame(columns)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    warnings.simplefilter("ignore")
+
+    model, name = load_model(None)
+    if model is None:
+        sys.exit("no model file found")
+    encoder = get_encoder()
+    encoder.check_model(model)
+
+    old_enc = best(lambda: legacy_encode_values(FORM), args.repeat, 2_000)
+    new_enc = best(lambda: encoder.encode_values(*FORM), args.repeat, 2_000)
+    old_row = legacy_encode_values(FORM)
+    new_row = encoder.encode_values(*FORM)
+    old_wrap = best(lambda: pd.DataFrame([old_row], columns=FEATURE_NAMES), args.repeat, 500)
+    new_wrap = best(lambda: encoder.as_matrix(new_row), args.repeat, 2_000)
+    frame = pd.DataFrame([old_row], columns=FEATURE_NAMES)
+    predict = best(lambda: model.predict_proba(frame), args.repeat, 20)
+
+    print(f"model {name}; one patient, predict_proba {predict * 1e3:.2f} ms")
+    print(f"{'single record':<22} {'encode us':>10} {'wrap us':>9} {'share of predict':>17}")
+    for label, enc, wrap in (("list.index+DataFrame", old_enc, old_wrap), ("HeartFeatureEncoder", new_enc, new_wrap)):
+        print(f"{label:<22} {enc * 1e6:>10.1f} {wrap * 1e6:>9.1f} {(enc + wrap) / predict:>16.2%}")
+
+    df = labelled_frame(args.rows)
+    buffer = np.empty((args.rows, encoder.n_features), dtype=np.float64)
+    assert np.array_equal(legacy_encode_frame(df), encoder.encode_columns(df, buffer))
+    old_batch = best(lambda: legacy_encode_frame(df), args.repeat)
+    new_batch = best(lambda: encoder.encode_columns(df, buffer), args.repeat)
+    forest = compile_forest(model)
+    score = best(lambda: forest.predict_proba(buffer), 1)
+
+    print(f"\n{args.rows:,} rows, compiled-forest predict_proba {score:.2f} s")
+    print(f"{'batch':<22} {'encode s':>10} {'Mrows/s':>9} {'share of predict':>17}")
+    for label, t in (("pandas per column", old_batch), ("encode_columns", new_batch)):
+        print(f"{label:<22} {t:>10.3f} {args.rows / t / 1e6:>9.2f} {t / score:>16.2%}")
+
+
+if __name__ == "__main__":
+    main()
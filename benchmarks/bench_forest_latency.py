@@ -0,0 +1,69 @@
+# bench_forest_latency.py - CompiledForest vs sklearn predict_proba latency (p50/p99)
+#
+# Usage: python benchmarks/bench_forest_latency.py [--iterations N]
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.forest import compile_forest  # noqa: E402
+from healthai.model import FEATURE_NAMES, load_model  # noqa: E402
+from bench_parallel_scaling import synthetic_features  # noqa: E402
+
+
+def latencies(fn, iterations):
+    fn()
+    out = np.empty(iterations)
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        out[i] = time.perf_counter() - t0
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare single-row and 1k-row predict_proba latency.")
+    ap.add_argument("--iterations", type=int, default=300)
+    args = ap.parse_args()
+    warnings.simplefilter("ignore")
+
+    model, name = load_model(None)
+    t0 = time.perf_counter()
+    compiled = compile_forest(model)
+    print(f"model={name} trees={compiled.n_trees} nodes={compiled.node_count} "
+          f"max_depth={compiled.max_depth} compile={1e3 * (time.perf_counter() - t0):.1f}ms")
+
+    X_all = synthetic_features(20_000, seed=1)
+    err = np.abs(compiled.predict_proba(X_all) - model.predict_proba(pd.DataFrame(X_all, columns=FEATURE_NAMES))).max()
+    assert err < 1e-9, f"compiled forest disagrees with sklearn (max abs err {err})"
+    print(f"max |proba diff| over {len(X_all):,} rows: {err:.2e}")
+    # Missing values follow each split's missing-value branch, as in sklearn.
+    X_nan = X_all.copy()
+    X_nan[np.random.default_rng(2).random(X_nan.shape) < 0.1] = np.nan
+    err = np.abs(compiled.predict_proba(X_nan) - model.predict_proba(pd.DataFrame(X_nan, columns=FEATURE_NAMES))).max()
+    assert err < 1e-9, f"compiled forest disagrees with sklearn on NaN rows (max abs err {err})"
+    print(f"max |proba diff| over {len(X_nan):,} rows with 10% NaN: {err:.2e}")
+
+    print(f"{'rows':>6} {'engine':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for rows in (1, 1000):
+        X = X_all[:rows]
+        df = pd.DataFrame(X, columns=FEATURE_NAMES)
+        results = {
+            "sklearn": latencies(lambda: model.predict_proba(df), args.iterations),
+            "compiled": latencies(lambda: compiled.predict_proba(X), args.iterations),
+        }
+        for engine, lat in results.items():
+            p50, p99 = np.percentile(lat, [50, 99]) * 1e3
+            print(f"{rows:>6} {engine:>10} {p50:>9.3f} {p99:>9.3f}")
+        speedup = np.median(results["sklearn"]) / np.median(results["compiled"])
+        print(f"{rows:>6} {'speedup':>10} {speedup:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
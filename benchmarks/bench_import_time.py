@@ -0,0 +1,61 @@
+# bench_import_time.py - cold-start cost of the headless core vs the Streamlit app stack
+#
+# Each scenario runs in a fresh interpreter so nothing is shared between runs.
+# Usage: python benchmarks/bench_import_time.py [--runs N]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ("streamlit", "pandas", "joblib", "sklearn", "numpy")
+
+SCENARIOS = [
+    ("import healthai", "import healthai"),
+    ("chatbot ready",
+     "import healthai; healthai.analyze_symptoms('fever, cough')"),
+    ("drug lookup ready",
+     "import healthai; healthai.get_drug_info('aspirin')"),
+    ("heart model ready",
+     "import healthai; m, _ = healthai.load_model(None); "
+     "healthai.predict_risk(m, [50, 1, 0, 120, 200, 0, 0, 150, 0, 1.0, 0, 0, 0])"),
+    ("legacy app imports",
+     "import streamlit, pandas, joblib"),
+]
+
+PROBE = """
+import sys, time, json, warnings
+warnings.simplefilter('ignore')
+t0 = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed,
+                   "heavy": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def run_once(code):
+    src = PROBE.format(code=code, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", src], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure cold import/start-up time in fresh processes.")
+    ap.add_argument("--runs", type=int, default=7)
+    args = ap.parse_args()
+
+    print(f"{'scenario':<20} {'median ms':>10} {'min ms':>8}  heavy modules loaded")
+    for name, code in SCENARIOS:
+        results = [run_once(code) for _ in range(args.runs)]
+        times = [r["seconds"] * 1e3 for r in results]
+        heavy = ", ".join(results[-1]["heavy"]) or "-"
+        print(f"{name:<20} {statistics.median(times):>10.1f} {min(times):>8.1f}  {heavy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# bench_kb_startup.py - chatbot start-up time and memory vs knowledge-base size
+#
+# For each size a synthetic knowledge base is written twice: as a KB file
+# (healthai.kb) and as JSON loaded into in-memory dicts, which is what the
+# built-in data amounts to. Each scenario runs in a fresh interpreter, builds
+# the chatbot, answers a symptom list and a drug lookup, and reports the time
+# taken and the resident set size.
+# Usage: python benchmarks/bench_kb_startup.py [--sizes 50 5000 50000 300000]
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from healthai.chatbot import HealthcareChatbot  # noqa: E402
+from healthai.kb import build_kb  # noqa: E402
+
+PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+from healthai.chatbot import HealthcareChatbot
+if {kb!r}:
+    bot = HealthcareChatbot(kb={path!r})
+else:
+    bot = HealthcareChatbot()
+    with open({path!r}, encoding="utf-8") as f:
+        for name, value in json.load(f).items():
+            section = getattr(bot, name)
+            section.extend(value) if isinstance(section, list) else section.update(value)
+bot.analyze_symptoms("fever, cough, chest pain")
+assert bot.get_drug_info({drug!r})["name"]
+elapsed = time.perf_counter() - t0
+with open("/proc/self/status") as f:
+    rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS"))
+print(json.dumps({{"seconds": elapsed, "rss_kb": rss}}))
+"""
+
+
+def synthetic_extra(n, seed=0):
+    """About n entries, split between symptoms and drugs (a quarter with aliases)."""
+    rng = random.Random(seed)
+    words = ["acute", "chronic", "left", "right", "upper", "lower", "sharp", "dull", "night", "morning"]
+    parts = ["ear", "knee", "wrist", "hip", "eye", "neck", "chest", "foot", "hand", "skin"]
+    kinds = ["pain", "swelling", "itching", "numbness", "stiffness", "cramps", "burning", "weakness"]
+    symptoms = [f"{rng.choice(words)} {rng.choice(parts)} {rng.choice(kinds)} {i}" for i in range(n // 2)]
+    drugs = {f"drug{i:06d}": {"uses": f"Use {i}", "dosage": f"{rng.randint(1, 50) * 10} mg daily",
+                              "side_effects": "Nausea, headache", "precautions": "Take with food"}
+             for i in range(n - n // 2)}
+    return {
+        "symptom_list": symptoms,
+        "symptom_explanations": {s: f"{s.capitalize()} should be checked if it persists." for s in symptoms},
+        "drug_database": drugs,
+        "drug_aliases": {f"brand{i:06d}": name for i, name in enumerate(list(drugs)[::4])},
+    }
+
+
+def run_once(path, kb, drug):
+    src = PROBE.format(root=ROOT, kb=kb, path=path, drug=drug)
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", src], check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare chatbot start-up on a KB file vs in-memory dicts.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[50, 5_000, 50_000, 300_000])
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'entries':>9} {'KB file':>10} {'JSON':>10} | {'KB ms':>8} {'KB MiB':>8} | {'dict ms':>8} {'dict MiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            extra = synthetic_extra(n)
+            kb_path, json_path = os.path.join(tmp, f"kb{n}.db"), os.path.join(tmp, f"kb{n}.json")
+            build_kb(kb_path, HealthcareChatbot(), extra)
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(extra, f)
+            drug = next(reversed(extra["drug_database"]))
+            row = [f"{n:>9,}", f"{os.path.getsize(kb_path) / 2**20:>8.1f}MB",
+                   f"{os.path.getsize(json_path) / 2**20:>8.1f}MB"]
+            for kb, path in ((True, kb_path), (False, json_path)):
+                results = [run_once(path, kb, drug) for _ in range(args.runs)]
+                ms = statistics.median(r["seconds"] for r in results) * 1e3
+                mib = statistics.median(r["rss_kb"] for r in results) / 1024
+                row.append(f"| {ms:>8.1f} {mib:>8.1f}")
+            print(" ".join(row))
+
+
+if __name__ == "__main__":
+    main()
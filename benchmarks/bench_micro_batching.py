@@ -0,0 +1,69 @@
+# bench_micro_batching.py - concurrent single-row predictions, direct vs MicroBatcher
+#
+# Simulates many users each asking for one prediction at a time (one thread
+# per user) and compares throughput and latency with and without batching.
+# Usage: python benchmarks/bench_micro_batching.py [--users 32] [--seconds 5]
+import argparse
+import os
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.batching import MicroBatcher  # noqa: E402
+from healthai.model import load_model, predict_risk  # noqa: E402
+from bench_parallel_scaling import synthetic_features  # noqa: E402
+
+
+def run(model, users, seconds, batcher=None):
+    X = synthetic_features(10_000, seed=2).tolist()
+    latencies = [[] for _ in range(users)]
+    stop_at = time.perf_counter() + seconds
+
+    def user(i):
+        j = i
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            predict_risk(model, X[j % len(X)], batcher=batcher)
+            latencies[i].append(time.perf_counter() - t0)
+            j += users
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    lat = np.concatenate([np.array(per_thread) for per_thread in latencies])
+    return len(lat) / (time.perf_counter() - t0), np.percentile(lat, [50, 99]) * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare per-request scoring with micro-batching.")
+    ap.add_argument("--users", type=int, default=32)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--max-batch", type=int, default=256)
+    ap.add_argument("--max-wait-ms", type=float, nargs="+", default=[1.0, 2.0, 5.0])
+    args = ap.parse_args()
+    warnings.simplefilter("ignore")
+
+    model, name = load_model(None)
+    print(f"model={name} users={args.users} seconds={args.seconds}")
+    print(f"{'mode':>16} {'pred/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'avg batch':>10} {'wait p99 ms':>12}")
+    rate, (p50, p99) = run(model, args.users, args.seconds)
+    print(f"{'direct':>16} {rate:>10,.0f} {p50:>8.2f} {p99:>8.2f} {1:>10.1f} {'-':>12}")
+    for wait in args.max_wait_ms:
+        batcher = MicroBatcher(max_batch=args.max_batch, max_wait_ms=wait)
+        rate, (p50, p99) = run(model, args.users, args.seconds, batcher)
+        m = batcher.metrics()
+        batcher.close()
+        print(f"{f'batched {wait:g}ms':>16} {rate:>10,.0f} {p50:>8.2f} {p99:>8.2f} "
+              f"{m['avg_batch_size']:>10.1f} {m['added_latency_ms']['p99']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# bench_model_load.py - cold start of a scoring worker: joblib pickle vs .hforest export
+#
+# Each run is a fresh interpreter that loads the model and scores one row,
+# as a newly started worker would. Reported: time to the first prediction
+# (imports included), resident memory afterwards, and which heavy modules
+# had to be imported. The .hforest file is exported to a temporary directory
+# unless --hforest points at one.
+# Usage: python benchmarks/bench_model_load.py [--runs N] [--hforest PATH]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from healthai.export import save_forest  # noqa: E402
+from healthai.model import find_model_file, read_model  # noqa: E402
+
+HEAVY = ("sklearn", "joblib", "pandas", "scipy")
+ROW = [55, 1, 2, 130, 250, 0, 1, 150, 0, 1.4, 1, 0, 2]
+
+SCENARIOS = [
+    ("joblib.load (pickle)",
+     "import joblib; m = joblib.load({path!r}, mmap_mode='r'); m.predict_proba([{row!r}])"),
+    ("load_forest (.hforest)",
+     "from healthai.export import load_forest; m = load_forest({path!r}); m.predict_proba([{row!r}])"),
+]
+
+PROBE = """
+import sys, time, json, warnings
+warnings.simplefilter('ignore')
+t0 = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - t0
+rss = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss = int(line.split()[1]) * 1024
+print(json.dumps({{"seconds": elapsed, "rss": rss,
+                   "heavy": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def run_once(code):
+    src = PROBE.format(code=code, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", src], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--runs", type=int, default=7)
+    ap.add_argument("--model", help="pickled model (default: auto-detect in the repo root)")
+    ap.add_argument("--hforest", help="existing .hforest export of --model")
+    args = ap.parse_args()
+
+    model_path = os.path.abspath(args.model or os.path.join(ROOT, find_model_file(ROOT)))
+    with tempfile.TemporaryDirectory() as tmp:
+        forest_path = args.hforest
+        if forest_path is None:
+            forest_path = os.path.join(tmp, os.path.splitext(os.path.basename(model_path))[0] + ".hforest")
+            save_forest(read_model(model_path), forest_path)
+        paths = [model_path, os.path.abspath(forest_path)]
+
+        print(f"{'loader':<24} {'file KB':>8} {'median ms':>10} {'min ms':>8} {'RSS MB':>7}  heavy modules")
+        for (name, template), path in zip(SCENARIOS, paths):
+            results = [run_once(template.format(path=path, row=ROW)) for _ in range(args.runs)]
+            times = [r["seconds"] * 1e3 for r in results]
+            rss = statistics.median(r["rss"] for r in results) / 2 ** 20
+            heavy = ", ".join(results[-1]["heavy"]) or "-"
+            print(f"{name:<24} {os.path.getsize(path) / 1024:>8.0f} {statistics.median(times):>10.1f} "
+                  f"{min(times):>8.1f} {rss:>7.1f}  {heavy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# bench_parallel_scaling.py - ParallelScorer throughput at 1, 2, 4 and 8 workers
+#
+# Usage: python benchmarks/bench_parallel_scaling.py [--rows N] [--workers 1 2 4 8]
+# Speedup is only meaningful up to the number of physical cores on the box.
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.batch import score_array  # noqa: E402
+from healthai.model import find_model_file, load_model  # noqa: E402
+from healthai.parallel import ParallelScorer  # noqa: E402
+
+
+def synthetic_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(20, 101, n), rng.integers(0, 2, n), rng.integers(0, 4, n),
+        rng.integers(90, 201, n), rng.integers(100, 601, n), rng.integers(0, 2, n),
+        rng.integers(0, 3, n), rng.integers(60, 221, n), rng.integers(0, 2, n),
+        rng.integers(0, 601, n) / 100.0, rng.integers(0, 3, n), rng.integers(0, 4, n),
+        rng.integers(0, 3, n),
+    ]).astype(np.float64)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure multi-process scoring throughput.")
+    ap.add_argument("--rows", type=int, default=400_000)
+    ap.add_argument("--chunksize", type=int, default=25_000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--start-method", default=None, help="fork / spawn / forkserver")
+    args = ap.parse_args()
+    warnings.simplefilter("ignore")
+
+    X = synthetic_features(args.rows)
+    model, name = load_model(None)
+    t0 = time.perf_counter()
+    ref_labels, _ = score_array(model, X)
+    base = args.rows / (time.perf_counter() - t0)
+    print(f"model={name} rows={args.rows:,} chunksize={args.chunksize:,} cpus={os.cpu_count()}")
+    print(f"{'workers':>8} {'rows/s':>12} {'speedup':>8}")
+    print(f"{'in-proc':>8} {base:>12,.0f} {1.0:>7.2f}x")
+
+    for n in args.workers:
+        with ParallelScorer(find_model_file(), workers=n, chunksize=args.chunksize,
+                            start_method=args.start_method) as scorer:
+            scorer.score_array(X[:n * args.chunksize])  # start the workers
+            t0 = time.perf_counter()
+            labels, _ = scorer.score_array(X)
+            rate = args.rows / (time.perf_counter() - t0)
+        assert (labels == ref_labels).all(), "parallel labels differ from in-process scoring"
+        print(f"{n:>8} {rate:>12,.0f} {rate / base:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
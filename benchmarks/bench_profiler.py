@@ -0,0 +1,104 @@
+# bench_profiler.py - cost of the sampling profiler on a busy request thread
+#
+# Times a fixed chatbot workload (symptom analysis, drug lookup and replies)
+# with profiling off, with a profile held open around the whole run at each
+# --interval, and with one profile per call (what HEALTHAI_PROFILE=1 does to
+# every request), and reports the slowdown against the unprofiled run.
+# First checks that profiles overlapping on one event loop thread (as the
+# HTTP service's asyncio handlers do) each keep their own samples.
+# Usage: python benchmarks/bench_profiler.py [--calls 20000] [--interval 0.001 0.005 0.02]
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.chatbot import HealthcareChatbot  # noqa: E402
+from healthai.profiling import RequestProfile, StackSampler  # noqa: E402
+
+MESSAGES = ["I have fever, cough and a sore throat", "tell me about ibuprofen", "hello there",
+            "I have a headache and nausea", "any advice for staying healthy?"]
+
+
+def workload(bot, calls):
+    for i in range(calls):
+        bot.generate_response(MESSAGES[i % len(MESSAGES)])
+
+
+def overlapping_profiles(bot, interval):
+    """Two requests profiled concurrently on one event loop, 300 ms and
+    100 ms long; returns their sample counts."""
+    sampler = StackSampler(interval)
+
+    async def request(seconds):
+        profile = RequestProfile("overlap", sampler=sampler)
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            bot.generate_response(MESSAGES[0])
+            await asyncio.sleep(0)
+        profile.finish()
+        return profile.samples
+
+    async def both():
+        return await asyncio.gather(request(0.3), request(0.1))
+
+    return asyncio.run(both())
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--calls", type=int, default=20_000)
+    ap.add_argument("--interval", type=float, nargs="+", default=[0.001, 0.005, 0.02])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    os.environ["HEALTHAI_PROFILE_DIR"] = tempfile.mkdtemp(prefix="bench_profiler_")
+
+    bot = HealthcareChatbot()
+    workload(bot, 100)   # warm caches
+
+    long_samples, short_samples = overlapping_profiles(bot, 0.005)
+    assert long_samples > short_samples > 0, (long_samples, short_samples)
+    print(f"overlapping profiles on one thread: 300 ms request {long_samples} samples, "
+          f"100 ms request {short_samples}")
+
+    base, _ = best_of(lambda: workload(bot, args.calls), args.repeat)
+    print(f"{'mode':<28} {'best s':>9} {'overhead':>9} {'samples':>9}")
+    print(f"{'off':<28} {base:>9.3f} {'-':>9} {'-':>9}")
+
+    for interval in args.interval:
+        sampler = StackSampler(interval)
+        samples = []
+
+        def profiled():
+            profile = RequestProfile("bench", sampler=sampler)
+            workload(bot, args.calls)
+            profile.finish()
+            samples.append(profile.samples)
+
+        best, _ = best_of(profiled, args.repeat)
+        print(f"{f'whole run, {interval * 1e3:g} ms':<28} {best:>9.3f} {best / base - 1:>+9.1%} {max(samples):>9,}")
+
+    def per_call():
+        for i in range(args.calls):
+            with RequestProfile("bench"):
+                bot.generate_response(MESSAGES[i % len(MESSAGES)])
+
+    best, _ = best_of(per_call, args.repeat)
+    print(f"{'one profile per call':<28} {best:>9.3f} {best / base - 1:>+9.1%} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
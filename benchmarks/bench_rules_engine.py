@@ -0,0 +1,70 @@
+# bench_rules_engine.py - subset rule matching vs a linear scan over every rule
+#
+# Generates --rules random condition rules (2-4 symptoms each) over a
+# --vocab symptom vocabulary and matches messages carrying 1-8 symptoms.
+# Usage: python benchmarks/bench_rules_engine.py [--rules 5000] [--vocab 500]
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.rules import RuleEngine  # noqa: E402
+
+
+def make_rules(rng, vocab, n):
+    rules = {}
+    while len(rules) < n:
+        symptoms = sorted(rng.sample(vocab, rng.randint(2, 4)))
+        rules["+".join(symptoms)] = [f"Condition {len(rules)}" + (" - EMERGENCY" if rng.random() < 0.05 else "")]
+    return rules
+
+
+def linear_match(rules, symptoms):
+    present = set(symptoms)
+    return {key for key, needed in rules if needed <= present}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark RuleEngine.match against a linear scan.")
+    ap.add_argument("--rules", type=int, nargs="+", default=[100, 5_000, 50_000])
+    ap.add_argument("--vocab", type=int, default=500)
+    ap.add_argument("--messages", type=int, default=2_000)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    vocab = [f"symptom {i}" for i in range(args.vocab)]
+    print(f"{'rules':>8} {'build ms':>9} {'match p50 us':>13} {'p99 us':>8} {'linear p50 us':>14} {'hits/msg':>9}")
+    for n in args.rules:
+        rules = make_rules(rng, vocab, n)
+        t0 = time.perf_counter()
+        engine = RuleEngine(rules)
+        build = time.perf_counter() - t0
+        flat = [(key, frozenset(key.split("+"))) for key in rules]
+        # messages built around real rules so there is something to find
+        messages = []
+        for _ in range(args.messages):
+            base = list(rng.choice(flat)[1])
+            messages.append(base + rng.sample(vocab, rng.randint(0, 6)))
+
+        fast, slow, hits = np.empty(len(messages)), np.empty(len(messages)), 0
+        for i, symptoms in enumerate(messages):
+            t0 = time.perf_counter()
+            matched = engine.match(symptoms)
+            fast[i] = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            expected = linear_match(flat, symptoms)
+            slow[i] = time.perf_counter() - t0
+            assert {r.key for r in matched} == expected
+            hits += len(matched)
+        p50, p99 = np.percentile(fast, [50, 99]) * 1e6
+        print(f"{n:>8,} {build * 1e3:>9.1f} {p50:>13.1f} {p99:>8.1f} "
+              f"{np.percentile(slow, 50) * 1e6:>14.1f} {hits / len(messages):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
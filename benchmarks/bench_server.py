@@ -0,0 +1,132 @@
+# bench_server.py - closed-loop load test against `python -m healthai.server`
+#
+# Starts the service in a subprocess, then keeps --concurrency keep-alive
+# connections busy for --seconds per endpoint and reports requests/s and
+# latency percentiles.
+# Usage: python benchmarks/bench_server.py [--concurrency 64] [--seconds 5]
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def random_features(rng):
+    return [rng.randint(20, 100), rng.randint(0, 1), rng.randint(0, 3), rng.randint(90, 200),
+            rng.randint(100, 600), rng.randint(0, 1), rng.randint(0, 2), rng.randint(60, 220),
+            rng.randint(0, 1), rng.randint(0, 600) / 100, rng.randint(0, 2), rng.randint(0, 3),
+            rng.randint(0, 2)]
+
+
+def workloads(rng):
+    return {
+        "chat": lambda: ("POST", "/chat", {"message": rng.choice(
+            ["hi", "I have fever and cough", "tell me about aspirin", "chest pain and arm pain", "any advice?"])}),
+        "symptoms": lambda: ("POST", "/symptoms", {"symptoms": "fever, cough, headache"}),
+        "drugs": lambda: ("GET", "/drugs?q=" + rng.choice(["aspirin", "ibu", "amox", "unknown"]), None),
+        "predict": lambda: ("POST", "/predict", {"features": random_features(rng)}),
+    }
+
+
+async def request(reader, writer, method, path, body):
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def run_load(port, make_request, concurrency, seconds):
+    latencies, errors = [], 0
+    stop_at = time.perf_counter() + seconds
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            status = await request(reader, writer, *make_request())
+            latencies.append(time.perf_counter() - t0)
+            errors += status != 200
+        writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return np.array(latencies), errors, time.perf_counter() - t0
+
+
+async def wait_ready(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await request(reader, writer, "GET", "/health", None)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def main_async(args):
+    port = free_port()
+    cmd = [sys.executable, "-W", "ignore", "-m", "healthai.server", "--port", str(port),
+           "--batch-wait-ms", str(args.batch_wait_ms), "--max-batch", str(args.max_batch)]
+    if args.no_cache:
+        cmd.append("--no-cache")
+    if args.compiled:
+        cmd.append("--compiled")
+    proc = subprocess.Popen(cmd, cwd=ROOT, stderr=subprocess.DEVNULL)
+    try:
+        await wait_ready(port)
+        rng = random.Random(0)
+        print(f"concurrency={args.concurrency} seconds={args.seconds} "
+              f"batch_wait_ms={args.batch_wait_ms} max_batch={args.max_batch} cache={not args.no_cache} "
+              f"compiled={args.compiled}")
+        print(f"{'endpoint':>10} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for name, make_request in workloads(rng).items():
+            if args.only and name not in args.only:
+                continue
+            lat, errors, elapsed = await run_load(port, make_request, args.concurrency, args.seconds)
+            p50, p99 = np.percentile(lat, [50, 99]) * 1e3
+            print(f"{name:>10} {len(lat) / elapsed:>10,.0f} {p50:>8.2f} {p99:>8.2f} {errors:>7}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load-test the HealthAI HTTP service.")
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--batch-wait-ms", type=float, default=2.0)
+    ap.add_argument("--max-batch", type=int, default=256)
+    ap.add_argument("--no-cache", action="store_true", help="measure raw model throughput")
+    ap.add_argument("--compiled", action="store_true", help="serve predictions from the CompiledForest")
+    ap.add_argument("--only", nargs="+", help="endpoints to run (chat symptoms drugs predict)")
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
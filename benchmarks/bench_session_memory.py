@@ -0,0 +1,140 @@
+# bench_session_memory.py - chat memory held by many concurrent sessions
+#
+# Simulates --sessions users chatting round-robin, --turns messages each, and
+# measures (tracemalloc) what the process holds afterwards:
+#   - legacy: one unbounded list of {"type", "content", "ts": ISO string}
+#     dicts per session,
+#   - ChatHistory: the per-session ring (capacity 200) with every turn's HTML
+#     cached, as after the turns were shown, but no budget,
+#   - SessionStore: the same histories under the per-session and global
+#     budgets (idle time 0, so every other session counts as idle).
+# Also reported: the store's own estimate and the cost of one request's
+# get/append/release. A small-budget run first checks that sessions the
+# global budget cannot hold even on disk are evicted with their spill files.
+# Usage: python benchmarks/bench_session_memory.py [--sessions N] [--turns N]
+#        [--session-kb KB] [--global-mb MB]
+import argparse
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.history import ChatHistory  # noqa: E402
+from healthai.sessions import SessionStore  # noqa: E402
+
+USER = "I have had a fever and a cough since yesterday (message {i}), what should I do?"
+BOT = ("**Urgency:** URGENT\n\nUrgent: Respiratory infection (flu, pneumonia, COVID-19). "
+       "Consult healthcare professional soon.\n\n**Recommendations:**\n- Monitor temperature regularly\n"
+       "- Rest and drink plenty of fluids\n- Seek care if breathing becomes difficult (reply {i})")
+
+
+def messages(turns):
+    for i in range(turns // 2):
+        yield "user", USER.format(i=i), None
+        yield "bot", BOT.format(i=i), "URGENT"
+
+
+def legacy(n_sessions, turns, spill_dir):
+    sessions = [[] for _ in range(n_sessions)]
+    for role, content, _ in messages(turns):
+        for history in sessions:
+            history.append({"type": role, "content": content + " ",
+                            "ts": datetime.datetime.now().isoformat()})
+    return sessions
+
+
+def histories(n_sessions, turns, spill_dir):
+    sessions = [ChatHistory(spill_dir=spill_dir) for _ in range(n_sessions)]
+    for role, content, urgency in messages(turns):
+        for history in sessions:
+            history.append(role, content + " ", urgency).html
+    return sessions
+
+
+def store(n_sessions, turns, spill_dir, session_budget, global_budget, timings=None):
+    sessions = SessionStore(session_budget=session_budget, global_budget=global_budget,
+                            idle_seconds=0, spill_dir=spill_dir)
+    ids = [f"{i:032x}" for i in range(n_sessions)]
+    for role, content, urgency in messages(turns):
+        for session_id in ids:
+            t0 = time.perf_counter()
+            session = sessions.get(session_id)
+            session.history.append(role, content + " ", urgency).html
+            sessions.release(session)
+            if timings is not None:
+                timings.append(time.perf_counter() - t0)
+    return sessions
+
+
+def check_eviction(spill_dir, n_sessions=50, turns=20, global_budget=64 * 1024):
+    """Under a global budget too small for every compacted session, the
+    least recently used idle sessions are dropped and their files deleted."""
+    sessions = SessionStore(session_budget=16 * 1024, global_budget=global_budget, idle_seconds=0,
+                            spill_dir=spill_dir)
+    for i in range(n_sessions):
+        session = sessions.get(f"{i:032x}")
+        for role, content, urgency in messages(turns):
+            session.history.append(role, content, urgency).html
+        sessions.release(session)
+    stats = sessions.stats()
+    assert sessions.memory_bytes() <= global_budget, stats
+    assert stats["evictions"] > 0 and len(sessions) + stats["evictions"] == n_sessions, stats
+    assert f"{n_sessions - 1:032x}" in sessions and f"{0:032x}" not in sessions, stats
+    files = {name[:-len(".jsonl")] for name in os.listdir(spill_dir)}
+    assert all(session_id in sessions for session_id in files), "evicted spill files left behind"
+    print(f"eviction: {len(sessions)} of {n_sessions} sessions kept in {sessions.memory_bytes() / 1024:.0f} KB "
+          f"(budget {global_budget / 1024:.0f} KB); {stats['spills']} spilled, {stats['evictions']} evicted")
+
+
+def measure(build):
+    spill_dir = tempfile.mkdtemp(prefix="healthai_bench_")
+    try:
+        tracemalloc.start()
+        obj = build(spill_dir)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return obj, current, peak
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--turns", type=int, default=300)
+    ap.add_argument("--session-kb", type=float, default=128)
+    ap.add_argument("--global-mb", type=float, default=16)
+    args = ap.parse_args()
+    session_budget, global_budget = int(args.session_kb * 1024), int(args.global_mb * 2 ** 20)
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        check_eviction(spill_dir)
+
+    print(f"{args.sessions} sessions x {args.turns} turns; budgets {args.session_kb:g} KB/session, "
+          f"{args.global_mb:g} MB total")
+    print(f"{'state':<14} {'held MB':>8} {'peak MB':>8} {'KB/session':>11}")
+    scenarios = [("legacy dicts", lambda d: legacy(args.sessions, args.turns, d)),
+                 ("ChatHistory", lambda d: histories(args.sessions, args.turns, d)),
+                 ("SessionStore", lambda d: store(args.sessions, args.turns, d, session_budget, global_budget))]
+    for name, build in scenarios:
+        obj, current, peak = measure(build)
+        print(f"{name:<14} {current / 2 ** 20:>8.1f} {peak / 2 ** 20:>8.1f} {current / 1024 / args.sessions:>11.1f}")
+    stats = obj.stats()
+    print(f"\nstore estimate {stats['bytes'] / 2 ** 20:.1f} MB in {stats['sessions']} sessions; "
+          f"compactions {stats['compactions']}, spills {stats['spills']}, evictions {stats['evictions']}")
+
+    timings = []
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store(args.sessions, min(args.turns, 100), spill_dir, session_budget, global_budget, timings)
+    timings.sort()
+    print(f"request get/append/release: median {timings[len(timings) // 2] * 1e6:.0f} us, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# bench_symptom_matcher.py - compiled PhraseMatcher and TokenMatcher vs the
+# per-symptom re.search loop
+#
+# Also checks that chat routing and analyze_symptoms find the same symptoms
+# when words are separated by newlines, tabs or runs of spaces.
+#
+# Usage: python benchmarks/bench_symptom_matcher.py [--words N] [--vocab N] [--repeat N]
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.chatbot import HealthcareChatbot  # noqa: E402
+from healthai.text import PhraseMatcher, TokenMatcher  # noqa: E402
+
+WHITESPACE_CASES = ("chest\npain and arm\tpain", "Chest   pain", "shortness of\nbreath",
+                    "fever  and\r\ncough", "jaw\t\tpain with chest \n pain")
+FILLER = ("i have been feeling this for a few days and it gets worse at night "
+          "my doctor said to rest but the pain in my side keeps coming back "
+          "since last week along with some other things").split()
+
+
+def legacy_extract(symptom_list, text):
+    """The original extract_symptoms loop, kept here as the reference."""
+    text_l = text.lower()
+    matched = []
+    for symptom in symptom_list:
+        pattern = r'\b' + re.escape(symptom) + r'\b'
+        if re.search(pattern, text_l):
+            matched.append(symptom)
+    seen = set()
+    out = []
+    for s in matched:
+        if s not in seen:
+            seen.add(s)
+            out.append(s)
+    return out
+
+
+def make_text(rng, vocab, words):
+    out = []
+    while len(out) < words:
+        if rng.random() < 0.05:
+            out.extend(rng.choice(vocab).split())
+        else:
+            out.append(rng.choice(FILLER))
+    return " ".join(out)
+
+
+def make_vocab(rng, base, size):
+    vocab = list(base)
+    stems = ["acute", "chronic", "left", "right", "upper", "lower", "mild", "sharp"]
+    while len(vocab) < size:
+        vocab.append(f"{rng.choice(stems)} {rng.choice(base)} {len(vocab)}")
+    return sorted(set(vocab), key=lambda s: -len(s))
+
+
+def check_whitespace(bot):
+    """Chat routing and the analysis paths must agree on the same text."""
+    for text in WHITESPACE_CASES:
+        _, routed = bot._route(text)
+        analyzed = bot.analyze_symptoms(text)
+        assert routed == analyzed["matched"], (text, routed, analyzed["matched"])
+        assert bot.triage(text)["urgency"] == analyzed["urgency"], text
+        single = " ".join(text.split())
+        assert bot.analyze_symptoms(single)["urgency"] == analyzed["urgency"], text
+    print(f"whitespace: chat and analyze_symptoms agree on {len(WHITESPACE_CASES)} inputs")
+
+
+def timeit(fn, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for t in texts:
+            fn(t)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(texts)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare symptom matchers on long free text.")
+    ap.add_argument("--words", type=int, default=2000, help="words per input text")
+    ap.add_argument("--texts", type=int, default=10)
+    ap.add_argument("--vocab", type=int, default=3000, help="size of the synthetic large vocabulary")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    bot = HealthcareChatbot()
+    cases = [("bundled", bot.symptom_list),
+             ("synthetic", make_vocab(rng, bot.symptom_list, args.vocab))]
+
+    check_whitespace(bot)
+    print(f"{'vocab':>10} {'size':>6} {'legacy ms':>10} {'compiled ms':>12} {'token ms':>9} {'speedup':>8}")
+    for name, vocab in cases:
+        matcher = PhraseMatcher(vocab)
+        tokens = TokenMatcher(vocab)
+        texts = [make_text(rng, vocab, args.words) for _ in range(args.texts)]
+        for t in texts:
+            expected = legacy_extract(vocab, t)
+            assert matcher.find_all(t.lower()) == expected, "matcher disagrees with legacy loop"
+            assert tokens.find_all(t.lower()) == expected, "token matcher disagrees with legacy loop"
+        legacy = timeit(lambda t: legacy_extract(vocab, t), texts, args.repeat)
+        compiled = timeit(lambda t: matcher.find_all(t.lower()), texts, args.repeat)
+        token = timeit(lambda t: tokens.find_all(t.lower()), texts, args.repeat)
+        print(f"{name:>10} {len(vocab):>6} {legacy * 1e3:>10.3f} {compiled * 1e3:>12.3f} {token * 1e3:>9.3f} "
+              f"{legacy / token:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# bench_triage.py - bulk triage throughput: per-message analyze_symptoms loop
+# vs the streaming pipeline at 1, 2, 4 workers
+#
+# Usage: python benchmarks/bench_triage.py [--messages N] [--workers 1 2 4]
+# Speedup is only meaningful up to the number of physical cores on the box.
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthai.chatbot import HealthcareChatbot  # noqa: E402
+from healthai.triage import triage_file  # noqa: E402
+
+FILLER = ["i have had", "since yesterday", "and also", "really bad", "my kid has", "what should i do"]
+
+
+def synthetic_log(path, n, seed=0):
+    rng = random.Random(seed)
+    vocab = HealthcareChatbot().symptom_list
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            symptoms = rng.sample(vocab, rng.randint(0, 4))
+            if rng.random() < 0.5:
+                text = ", ".join(symptoms)
+            else:
+                text = " ".join([rng.choice(FILLER)] + [f"{s} {rng.choice(FILLER)}" for s in symptoms])
+            f.write(json.dumps({"id": i, "message": text}) + "\n")
+
+
+def legacy_loop(path, out_path):
+    """One analyze_symptoms call per message, all output collected in memory."""
+    bot = HealthcareChatbot()
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    results = []
+    for r in records:
+        a = bot.analyze_symptoms(r["message"])
+        results.append({"id": r["id"], "urgency": a["urgency"], "matched": a["matched"],
+                        "recommendations": a["recommendations"]})
+    with open(out_path, "w", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps(r) + "\n")
+    return len(results)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure bulk triage throughput.")
+    ap.add_argument("--messages", type=int, default=200_000)
+    ap.add_argument("--chunksize", type=int, default=2_000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log, out = os.path.join(tmp, "log.jsonl"), os.path.join(tmp, "out.jsonl")
+        synthetic_log(log, args.messages)
+        print(f"{args.messages:,} messages, {os.cpu_count()} CPUs")
+        print(f"{'mode':<22} {'seconds':>8} {'msg/s':>10} {'msg/s/core':>11}")
+
+        t0 = time.perf_counter()
+        n = legacy_loop(log, out)
+        elapsed = time.perf_counter() - t0
+        print(f"{'analyze_symptoms loop':<22} {elapsed:>8.2f} {n / elapsed:>10,.0f} {n / elapsed:>11,.0f}")
+
+        for workers in args.workers:
+            stats = triage_file(log, out, workers=workers, chunksize=args.chunksize)
+            print(f"{f'pipeline x{workers}':<22} {stats['seconds']:>8.2f} {stats['messages_per_sec']:>10,.0f} "
+                  f"{stats['messages_per_sec_per_core']:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
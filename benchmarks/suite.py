@@ -0,0 +1,180 @@
+# suite.py - headless benchmark suite over the chatbot and predictor hot paths
+#
+# Every case is timed call by call (garbage collector paused, after a short
+# warm-up) until --min-time has passed, and reported as p50/p95/p99 latency
+# plus calls per second. The ttfb/ cases time the first section of a
+# streamed chat reply against the whole reply. Results are written as JSON;
+# given a baseline file the run fails (exit 1) when a case's p50 got slower
+# than --threshold.
+#
+# Usage:
+#   python benchmarks/suite.py                                   # JSON on stdout
+#   python benchmarks/suite.py -o results.json --baseline benchmarks/baseline.json
+#   python benchmarks/suite.py --save-baseline benchmarks/baseline.json
+#   python benchmarks/suite.py -k drug -k predict                # only some cases
+#
+# Baselines are machine-specific: regenerate benchmarks/baseline.json on the
+# machine that runs the comparison.
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from healthai.batch import score_array  # noqa: E402
+from healthai.cache import AnalysisCache  # noqa: E402
+from healthai.chatbot import HealthcareChatbot  # noqa: E402
+from healthai.model import find_model_file, predict_risk  # noqa: E402
+from healthai.registry import ModelRegistry  # noqa: E402
+from bench_parallel_scaling import synthetic_features  # noqa: E402
+
+SHORT_TEXT = "I have a headache and a fever"
+LONG_TEXT = " ".join([
+    "I have been feeling unwell for a few days now and it seems to get worse at night.",
+    "It started with a sore throat and a runny nose, then some fatigue and dizziness,",
+    "and today I noticed a rash on my arm along with some joint pain and swelling in my knee.",
+    "My doctor said to rest but the back pain keeps coming back and I also have nausea.",
+] * 5)
+
+RESPONSES = {
+    "greeting": "hello there",
+    "drug": "tell me about ibuprofen",
+    "emergency": "please help me, I think this is an emergency",
+    "symptoms": "I have fever, cough and a sore throat",
+    "advice": "any advice for staying healthy?",
+    "fallback": "what can you do",
+}
+
+TTFB_TEXTS = {
+    "symptoms": LONG_TEXT,
+    "emergency": "chest pain, arm pain, fever, cough, headache, dizziness",
+}
+
+
+def cases():
+    """``{name: zero-argument callable}`` for every benchmarked hot path."""
+    bot = HealthcareChatbot()
+    out = {
+        "extract_symptoms/short": lambda: bot.extract_symptoms(SHORT_TEXT),
+        "extract_symptoms/long": lambda: bot.extract_symptoms(LONG_TEXT),
+        "analyze_symptoms/list": lambda: bot.analyze_symptoms("fever, cough, headache"),
+        "analyze_symptoms/text": lambda: bot.analyze_symptoms(SHORT_TEXT),
+        "get_drug_info/hit": lambda: bot.get_drug_info("Ibuprofen"),
+        "get_drug_info/partial": lambda: bot.get_drug_info("amox"),
+        "get_drug_info/miss": lambda: bot.get_drug_info("unknownazole"),
+    }
+    for intent, text in RESPONSES.items():
+        out[f"generate_response/{intent}"] = lambda text=text: bot.generate_response(text)
+    # Time to first byte of a chat reply: the whole generate_response string
+    # vs the first section of stream_response, on a bot without the analysis
+    # cache so every call analyzes from scratch.
+    cold = HealthcareChatbot()
+    cold.analysis_cache = AnalysisCache(maxsize=0)
+    for intent, text in TTFB_TEXTS.items():
+        out[f"ttfb/generate_response/{intent}"] = lambda text=text: cold.generate_response(text)
+        out[f"ttfb/stream_response/{intent}"] = lambda text=text: next(cold.stream_response(text))
+
+    model_path = find_model_file(ROOT)
+    if model_path is None:
+        return out
+    model_path = os.path.join(ROOT, model_path)
+    registry = ModelRegistry()
+    model = registry.get(model_path).model
+    row = [55, 1, 2, 130, 250, 0, 1, 150, 0, 1.4, 1, 0, 2]
+    batch = synthetic_features(1_000, seed=2)
+    out.update({
+        "load_model/cold": lambda: ModelRegistry().get(model_path),
+        "load_model/warm": lambda: registry.get(model_path),
+        "predict/single_row": lambda: predict_risk(model, row),
+        "predict/batch_1000": lambda: score_array(model, batch),
+    })
+    return out
+
+
+def measure(fn, min_time, min_runs=20, max_runs=100_000):
+    fn()  # warm-up
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        deadline = time.perf_counter() + min_time
+        while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() < deadline):
+            t0 = time.perf_counter_ns()
+            fn()
+            samples.append(time.perf_counter_ns() - t0)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    us = np.array(samples) / 1e3
+    p50, p95, p99 = np.percentile(us, [50, 95, 99])
+    return {"runs": len(us), "p50_us": float(p50), "p95_us": float(p95), "p99_us": float(p99),
+            "mean_us": float(us.mean()), "ops_per_sec": float(1e6 / us.mean())}
+
+
+def compare(results, baseline, threshold, metric="p50_us"):
+    """``[(case, old, new, change)]`` for cases slower than ``threshold`` (0.1 = 10%)."""
+    regressions = []
+    for name, new in results.items():
+        old = baseline.get(name)
+        if not old or not old.get(metric):
+            continue
+        change = new[metric] / old[metric] - 1
+        if change > threshold:
+            regressions.append((name, old[metric], new[metric], change))
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the HealthAI benchmark suite.")
+    ap.add_argument("-o", "--output", help="write results JSON here")
+    ap.add_argument("--baseline", help="baseline JSON to compare against")
+    ap.add_argument("--save-baseline", help="write these results as the new baseline")
+    ap.add_argument("--threshold", type=float, default=0.10,
+                    help="allowed p50 slowdown before a case counts as a regression (default 0.10)")
+    ap.add_argument("--min-time", type=float, default=0.5, help="seconds spent timing each case")
+    ap.add_argument("-k", "--filter", action="append", help="only run cases containing this text")
+    args = ap.parse_args()
+    warnings.simplefilter("ignore")
+
+    results = {}
+    print(f"{'case':<30} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'ops/s':>12}", file=sys.stderr)
+    for name, fn in cases().items():
+        if args.filter and not any(f in name for f in args.filter):
+            continue
+        r = results[name] = measure(fn, args.min_time)
+        print(f"{name:<30} {r['p50_us']:>10.1f} {r['p95_us']:>10.1f} {r['p99_us']:>10.1f} "
+              f"{r['ops_per_sec']:>12,.0f}", file=sys.stderr)
+
+    report = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                       "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "results": results}
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if not args.output:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new, change in regressions:
+            print(f"REGRESSION {name}: p50 {old:.1f}us -> {new:.1f}us (+{change:.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# healthai - headless core of the HealthAI Suite
+#
+# Nothing here imports Streamlit. Submodules are loaded on first attribute
+# access so `import healthai` costs next to nothing; pandas/joblib are only
+# pulled in when a model is actually loaded or scored.
+import importlib
+
+_EXPORTS = {
+    "HealthcareChatbot": "chatbot",
+    "get_chatbot": "chatbot",
+    "analyze_symptoms": "chatbot",
+    "get_drug_info": "chatbot",
+    "generate_response": "chatbot",
+    "PhraseMatcher": "text",
+    "IntentRouter": "intents",
+    "DrugIndex": "drugs",
+    "RuleEngine": "rules",
+    "triage_file": "triage",
+    "ChatHistory": "history",
+    "SessionStore": "sessions",
+    "get_session_store": "sessions",
+    "get_metrics": "metrics",
+    "KnowledgeBase": "kb",
+    "build_kb": "kb",
+    "FEATURE_NAMES": "model",
+    "HeartFeatureEncoder": "encoder",
+    "load_model": "model",
+    "encode_features": "model",
+    "predict_risk": "model",
+    "top_feature_importances": "model",
+    "score_frame": "batch",
+    "score_file": "batch",
+    "ParallelScorer": "parallel",
+    "CompiledForest": "forest",
+    "compile_forest": "forest",
+    "save_forest": "export",
+    "load_forest": "export",
+    "ForestExplainer": "explain",
+    "ModelRegistry": "registry",
+    "get_registry": "registry",
+    "PredictionCache": "cache",
+    "get_prediction_cache": "cache",
+    "MicroBatcher": "batching",
+    "get_batcher": "batching",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'healthai' has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
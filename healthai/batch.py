@@ -0,0 +1,203 @@
+# batch.py - streaming batch scoring of heart-disease extracts (CSV / Parquet)
+#
+# Usage:
+#   python -m healthai.batch patients.csv -o scored.csv --chunksize 50000
+#   python -m healthai.batch patients.csv -o scored.csv --workers 0   # all cores
+#   python -m healthai.batch patients.csv -o explained.csv --explain  # + per-feature credits
+#
+# Each chunk is encoded column-wise by the HeartFeatureEncoder into one
+# reused buffer and scored with a single predict_proba call; the label is
+# derived from the probabilities.
+# With --explain every row also gets a ``contrib_<feature>`` column per
+# feature (see healthai.explain) and the model's ``base_value``.
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from .encoder import get_encoder
+from .model import FEATURE_NAMES, load_model
+
+DEFAULT_CHUNKSIZE = 50_000
+
+
+def encode_frame(df, out=None):
+    """Encode a DataFrame with the 13 feature columns into an (n, 13) float64 array.
+
+    Categorical columns may hold either the UI label or the numeric code;
+    see ``HeartFeatureEncoder.encode_columns`` (``out`` is its buffer).
+    """
+    return get_encoder().encode_columns(df, out)
+
+
+def positive_class_index(model):
+    """Column of ``predict_proba`` that holds the disease (class 1) probability."""
+    classes = list(model.classes_)
+    return classes.index(1) if 1 in classes else len(classes) - 1
+
+
+def score_array(model, X):
+    """Return ``(labels, probabilities)`` for an encoded feature matrix.
+
+    One ``predict_proba`` call (the model's columns are checked against the
+    encoder's schema once, and ``X`` is passed under them without a copy);
+    the label is the argmax
+    class, exactly as sklearn's own ``predict`` derives it.
+    """
+    encoder = get_encoder()
+    encoder.check_model(model)
+    proba = model.predict_proba(encoder.model_input(model, X))
+    labels = np.asarray(model.classes_).take(proba.argmax(axis=1))
+    return labels, proba
+
+
+def score_frame(model, df, buffer=None):
+    """Score a DataFrame chunk; returns it with ``prediction`` and ``probability`` columns.
+    ``buffer`` is an optional preallocated encoding buffer (see ``encode_frame``)."""
+    labels, proba = score_array(model, encode_frame(df, buffer))
+    out = df.copy()
+    out['prediction'] = labels
+    out['probability'] = proba[:, positive_class_index(model)]
+    return out
+
+
+def explain_frame(explainer, df, buffer=None):
+    """Score a chunk from the explainer's path attributions: ``prediction``,
+    ``probability``, ``base_value`` and one ``contrib_<feature>`` column each."""
+    from .explain import explain_array
+
+    labels, proba, credits = explain_array(explainer, encode_frame(df, buffer))
+    out = df.copy()
+    out['prediction'] = labels
+    out['probability'] = proba[:, explainer.class_index]
+    out['base_value'] = explainer.base_value
+    for j, name in enumerate(explainer.feature_names):
+        out[f'contrib_{name}'] = credits[:, j]
+    return out
+
+
+def _is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def iter_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield DataFrame chunks of at most ``chunksize`` rows from a CSV or Parquet file."""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class _ChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._first = True
+
+    def write(self, df):
+        if self.path is None:
+            return
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def score_file(model, input_path, output_path=None, chunksize=DEFAULT_CHUNKSIZE, progress=None,
+               explain=False):
+    """Stream ``input_path`` through the model chunk by chunk.
+
+    Scored chunks are appended to ``output_path`` (CSV or Parquet by
+    extension) as they finish, so memory stays bounded by ``chunksize``.
+    ``explain`` adds the per-feature attribution columns of ``explain_frame``.
+    ``progress`` is called with the running stats after every chunk.
+    Returns ``{"rows", "chunks", "positives", "seconds", "rows_per_sec"}``.
+    """
+    if explain:
+        from .explain import ForestExplainer
+
+        explainer = ForestExplainer(model)
+    # One encoding buffer for the whole file; every chunk is written into it.
+    buffer = np.empty((chunksize, len(FEATURE_NAMES)), dtype=np.float64)
+    writer = _ChunkWriter(output_path)
+    stats = {"rows": 0, "chunks": 0, "positives": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    start = time.perf_counter()
+    try:
+        for chunk in iter_chunks(input_path, chunksize):
+            if explain:
+                scored = explain_frame(explainer, chunk, buffer)
+            else:
+                scored = score_frame(model, chunk, buffer)
+            writer.write(scored)
+            stats["rows"] += len(scored)
+            stats["chunks"] += 1
+            stats["positives"] += int((scored['prediction'] == 1).sum())
+            stats["seconds"] = time.perf_counter() - start
+            stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+            if progress:
+                progress(stats)
+    finally:
+        writer.close()
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m healthai.batch",
+                                 description="Score a CSV/Parquet extract with the heart-disease model.")
+    ap.add_argument("input", help="CSV or Parquet file with the 13 feature columns")
+    ap.add_argument("-o", "--output", help="where to write scored rows (.csv or .parquet)")
+    ap.add_argument("-m", "--model", help="model file (default: auto-detect in the current directory)")
+    ap.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    ap.add_argument("-w", "--workers", type=int, default=1,
+                    help="worker processes (0 = one per core; default: score in-process)")
+    ap.add_argument("--explain", action="store_true",
+                    help="add per-feature attribution columns (contrib_<feature>, base_value)")
+    ap.add_argument("-q", "--quiet", action="store_true", help="only print the final summary")
+    args = ap.parse_args(argv)
+    if args.explain and args.workers != 1:
+        ap.error("--explain scores in-process; drop --workers")
+    if any(path and _is_parquet(path) for path in (args.input, args.output)) \
+            and importlib.util.find_spec("pyarrow") is None:
+        ap.error("Parquet files need pyarrow: pip install pyarrow")
+
+    def progress(stats):
+        print(f"  {stats['rows']:>10,} rows  {stats['rows_per_sec']:>12,.0f} rows/s", file=sys.stderr)
+
+    if args.workers != 1:
+        from .parallel import ParallelScorer
+
+        with ParallelScorer(args.model, workers=args.workers or None, chunksize=args.chunksize) as scorer:
+            name = f"{os.path.basename(scorer.model_path)} x{scorer.workers} workers"
+            stats = scorer.score_file(args.input, args.output, progress=None if args.quiet else progress)
+    else:
+        model, name = load_model(args.model)
+        if model is None:
+            ap.error(f"could not load model: {name or 'no model file found'}")
+        stats = score_file(model, args.input, args.output, args.chunksize,
+                           progress=None if args.quiet else progress, explain=args.explain)
+    print(f"Scored {stats['rows']:,} rows from {os.path.basename(args.input)} with {name} "
+          f"in {stats['seconds']:.2f}s ({stats['rows_per_sec']:,.0f} rows/s, "
+          f"{stats['positives']:,} high risk)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
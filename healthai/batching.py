@@ -0,0 +1,180 @@
+# batching.py - dynamic micro-batching in front of the heart model
+#
+# Callers submit one encoded row at a time. A dispatcher thread collects rows
+# for up to ``max_wait_ms`` or ``max_batch`` rows, whichever comes first, and
+# scores the whole batch with one predict_proba call on a small thread pool.
+# Each caller gets its own result back through a future, so the same
+# scheduler serves blocking code (Streamlit sessions run in threads) and
+# asyncio code (``predict_async``). A malformed row is rejected in submit()
+# and never joins a batch; should a batch still fail, its rows are scored
+# one by one so only the offending caller sees the error.
+import asyncio
+import collections
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from .batch import score_array
+from .metrics import register_collector
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT_MS = 2.0
+_LATENCY_SAMPLES = 2048
+
+
+def score_rows(model, rows):
+    """Score encoded rows in one call; one ``predict_risk``-shaped dict per row."""
+    labels, proba = score_array(model, np.asarray(rows, dtype=np.float64))
+    return [{"prediction": int(label), "probabilities": [float(v) for v in p]}
+            for label, p in zip(labels, proba)]
+
+
+class MicroBatcher:
+    """Merge concurrent single-row predictions into batched predict_proba calls.
+
+    ``workers`` threads run the batches, so collecting the next batch overlaps
+    with scoring the current one.
+    """
+
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS, workers=2):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.SimpleQueue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="healthai-batch")
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_seen = 0
+        self.batch_sizes = collections.Counter()
+        self._waits = collections.deque(maxlen=_LATENCY_SAMPLES)
+        self._dispatcher = threading.Thread(target=self._run, name="healthai-batcher", daemon=True)
+        self._dispatcher.start()
+
+    # --- public API -------------------------------------------------------
+    def submit(self, model, features):
+        """Queue one row; returns a ``concurrent.futures.Future`` for its result.
+        Raises ``ValueError`` (or ``TypeError``) at once for a row that is not
+        a flat numeric vector of the model's width."""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        row = np.asarray(features, dtype=np.float64)
+        n_features = getattr(model, 'n_features_in_', None) or getattr(model, 'n_features', None)
+        if row.ndim != 1 or (n_features is not None and len(row) != n_features):
+            raise ValueError(f"expected one row of {n_features or 'n'} features, got shape {row.shape}")
+        fut = Future()
+        self._queue.put((model, row, fut, time.perf_counter()))
+        return fut
+
+    def predict(self, model, features, timeout=None):
+        return self.submit(model, features).result(timeout)
+
+    async def predict_async(self, model, features):
+        return await asyncio.wrap_future(self.submit(model, features))
+
+    def metrics(self):
+        with self._lock:
+            waits = np.array(self._waits) * 1e3 if self._waits else np.zeros(1)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self.batches,
+                "rows": self.rows,
+                "avg_batch_size": self.rows / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+                "added_latency_ms": {"p50": float(np.percentile(waits, 50)),
+                                     "p99": float(np.percentile(waits, 99)),
+                                     "max": float(waits.max())},
+            }
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._executor.shutdown()
+
+    # --- dispatcher ---------------------------------------------------------
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch):
+        now = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.rows += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.batch_sizes[_size_bucket(len(batch))] += 1
+            self._waits.extend(now - item[3] for item in batch)
+        # Requests that raced a model swap are scored per model object.
+        groups = {}
+        for item in batch:
+            groups.setdefault(id(item[0]), []).append(item)
+        for items in groups.values():
+            self._executor.submit(self._score, items)
+
+    @staticmethod
+    def _score(items):
+        futures = [item[2] for item in items]
+        try:
+            results = score_rows(items[0][0], [item[1] for item in items])
+        except Exception as e:
+            if len(items) == 1:
+                futures[0].set_exception(e)
+                return
+            # Keep one bad row from failing everyone merged with it.
+            for item in items:
+                MicroBatcher._score([item])
+            return
+        for fut, result in zip(futures, results):
+            fut.set_result(result)
+
+
+def _size_bucket(n):
+    """Power-of-two bucket label for the batch-size histogram."""
+    upper = 1
+    while upper < n:
+        upper *= 2
+    return upper
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Process-wide scheduler. ``HEALTHAI_MAX_BATCH`` and ``HEALTHAI_BATCH_WAIT_MS``
+    set the batching window."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    max_batch=int(os.environ.get("HEALTHAI_MAX_BATCH", DEFAULT_MAX_BATCH)),
+                    max_wait_ms=float(os.environ.get("HEALTHAI_BATCH_WAIT_MS", DEFAULT_MAX_WAIT_MS)))
+                register_collector("micro_batcher", _batcher.metrics)
+    return _batcher
@@ -0,0 +1,172 @@
+# cache.py - memoized heart-risk predictions and symptom analyses
+#
+# Prediction keys are (model digest, encoded feature tuple), so loading a different
+# model (or a new version of the same file) can never return a stale answer:
+# old entries simply stop being looked up and age out of the LRU.
+#
+# An optional SQLite file backs the in-memory LRU so several processes (or
+# restarts) share results; lookups that miss memory fall through to it.
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .metrics import register_collector
+
+DEFAULT_MAXSIZE = 10_000
+DEFAULT_ANALYSIS_MAXSIZE = 4_096
+
+
+def feature_key(features):
+    """Canonical hashable form of an encoded feature row (oldpeak-safe rounding)."""
+    return tuple(round(float(v), 6) for v in features)
+
+
+class PredictionCache:
+    """Bounded LRU (optionally with TTL) of ``predict_risk`` results.
+
+    ``path`` enables the shared on-disk store. Counters: ``hits`` (memory),
+    ``disk_hits``, ``misses`` and ``evictions``.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=None, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = collections.OrderedDict()   # key -> (expires_at, result)
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS predictions ("
+                             "model TEXT, features TEXT, result TEXT, expires REAL, "
+                             "PRIMARY KEY (model, features))")
+
+    def _expiry(self):
+        return time.time() + self.ttl if self.ttl else None
+
+    def _store(self, key, expires, result):
+        self._data[key] = (expires, result)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, model_key, features):
+        key = (model_key, feature_key(features))
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                if item[0] is None or item[0] > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return dict(item[1])
+                del self._data[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT result, expires FROM predictions WHERE model = ? AND features = ?",
+                    (model_key, json.dumps(key[1]))).fetchone()
+                if row and (row[1] is None or row[1] > now):
+                    result = json.loads(row[0])
+                    self._store(key, row[1], result)
+                    self.disk_hits += 1
+                    return dict(result)
+            self.misses += 1
+            return None
+
+    def put(self, model_key, features, result):
+        key = (model_key, feature_key(features))
+        expires = self._expiry()
+        with self._lock:
+            self._store(key, expires, dict(result))
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                                 (model_key, json.dumps(key[1]), json.dumps(result), expires))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {"size": len(self._data), "maxsize": self.maxsize,
+                    "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                    "evictions": self.evictions,
+                    "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0}
+
+
+class AnalysisCache:
+    """Bounded LRU of finished symptom analyses, keyed by the frozenset of
+    matched symptoms. Values are shared between callers and never copied."""
+
+    def __init__(self, maxsize=DEFAULT_ANALYSIS_MAXSIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """Process-wide cache. ``HEALTHAI_PREDICTION_CACHE_DB`` turns on the disk store,
+    ``HEALTHAI_PREDICTION_CACHE_TTL`` (seconds) turns on expiry."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                ttl = os.environ.get("HEALTHAI_PREDICTION_CACHE_TTL")
+                _cache = PredictionCache(ttl=float(ttl) if ttl else None,
+                                         path=os.environ.get("HEALTHAI_PREDICTION_CACHE_DB") or None)
+                register_collector("prediction_cache", _cache.stats)
+    return _cache
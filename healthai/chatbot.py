@@ -0,0 +1,584 @@
+# chatbot.py - rule-based healthcare chatbot (symptoms, urgency, drug info)
+import asyncio
+import collections
+import functools
+import itertools
+import os
+import random
+
+from .cache import DEFAULT_ANALYSIS_MAXSIZE, AnalysisCache
+from .drugs import DrugIndex, load_formulary, normalize
+from .intents import IntentRouter
+from .metrics import register_collector, timed
+from .rules import RuleEngine
+from .text import TokenMatcher
+
+NO_SYMPTOM_RECOMMENDATIONS = ("Provide clearer symptom description", "List main symptoms separated by commas")
+
+
+class Analysis:
+    """Finished analysis of one symptom set. Cached instances are shared, so
+    treat them as read-only; ``as_dict``/``triage_dict`` give fresh dicts.
+
+    The message is kept in its three parts - the urgency message, the
+    symptom explanations and the follow-up question - so the chat reply can
+    be delivered as sections: urgency, explanation, recommendations,
+    follow-up.
+    """
+    __slots__ = ("urgency", "parts", "recommendations", "matched", "_reply")
+
+    def __init__(self, urgency, message, recommendations, matched, explanation="", follow_up=""):
+        self.urgency = urgency
+        self.parts = (message, explanation, follow_up)
+        self.recommendations = tuple(recommendations)
+        self.matched = tuple(matched)
+        self._reply = None
+
+    @property
+    def message(self):
+        return "".join(self.parts)
+
+    def events(self):
+        """``(field, value)`` pairs in delivery order; see ``stream_symptoms``."""
+        lead, explanation, follow_up = self.parts
+        yield "urgency", self.urgency
+        yield "message", lead
+        if explanation:
+            yield "message", explanation
+        yield "recommendations", list(self.recommendations)
+        if follow_up:
+            yield "message", follow_up
+        yield "matched", list(self.matched)
+
+    @property
+    def reply(self):
+        """The chat reply for this analysis (built once)."""
+        if self._reply is None:
+            self._reply = "".join(reply_sections(self.events()))
+        return self._reply
+
+    def as_dict(self):
+        return {"urgency": self.urgency, "message": self.message,
+                "recommendations": list(self.recommendations), "matched": list(self.matched)}
+
+    def triage_dict(self):
+        return {"urgency": self.urgency, "matched": list(self.matched),
+                "recommendations": list(self.recommendations)}
+
+
+def reply_sections(events):
+    """Chat-reply sections for a stream of analysis events: the urgency
+    header travels with the first message part, so an emergency is in the
+    first section."""
+    header = ""
+    for field, value in events:
+        if field == "urgency":
+            header = f"**Urgency:** {value}\n\n"
+        elif field == "message":
+            yield header + value
+            header = ""
+        elif field == "recommendations":
+            recs = "\n".join([f"- {r}" for r in value])
+            yield f"\n\n**Recommendations:**\n{recs}"
+
+
+NO_SYMPTOM_ANALYSIS = Analysis(
+    "ROUTINE",
+    "I couldn't detect clear symptoms. Please describe them specifically or list them separated by commas.",
+    NO_SYMPTOM_RECOMMENDATIONS, ())
+
+
+class HealthcareChatbot:
+    """Rule-based assistant.
+
+    ``kb`` (a KnowledgeBase or the path of one) replaces the built-in data
+    below with lazily loaded records from an on-disk knowledge base.
+    """
+
+    def __init__(self, kb=None):
+        if kb is not None:
+            self._use_kb(kb)
+            return
+
+        self.symptom_list = sorted([
+            "chest pain", "shortness of breath", "severe bleeding", "high fever",
+            "difficulty breathing", "unconscious", "fever", "cough", "loss of taste", 
+            "loss of smell", "sore throat", "runny nose", "headache", "dizziness", 
+            "nausea", "vomiting", "abdominal pain", "diarrhea", "constipation", 
+            "back pain", "leg pain", "arm pain", "jaw pain", "shoulder pain",
+            "joint pain", "swelling", "rash", "fatigue", "pain", "itching", 
+            "numbness", "palpitations", "weakness"
+        ], key=lambda s: -len(s))
+
+        self.emergency_symptoms = {
+            "chest pain", "shortness of breath", "severe bleeding", 
+            "unconscious", "difficulty breathing"
+        }
+
+        self.heart_attack_symptoms = {"chest pain", "arm pain", "jaw pain", "shoulder pain"}
+
+        self.symptom_conditions = {
+            "chest pain+dizziness": ["Possible cardiac issue (arrhythmia, ischemia)"],
+            "chest pain+arm pain": ["Possible heart attack - EMERGENCY"],
+            "chest pain+jaw pain": ["Possible heart attack - EMERGENCY"],
+            "chest pain+shortness of breath": ["Cardiac or pulmonary emergency"],
+            "fever+cough": ["Respiratory infection (flu, pneumonia, COVID-19)"],
+            "fever+rash": ["Viral exanthem, allergic reaction"],
+            "back pain+leg pain+numbness": ["Sciatica, herniated disc"],
+            "joint pain+swelling": ["Arthritis (OA/RA), gout"],
+            "leg pain+swelling+redness": ["Deep vein thrombosis (DVT)"],
+            "abdominal pain+nausea+vomiting": ["Gastroenteritis, food poisoning"]
+        }
+
+        self.symptom_explanations = {
+            "fever": "Fever commonly indicates infection or inflammation. Monitor temperature and stay hydrated.",
+            "cough": "Cough may indicate respiratory infection, asthma, or irritation. Rest and stay hydrated.",
+            "chest pain": "Chest pain can be serious. If severe, crushing, or radiates to arm/jaw, seek emergency care immediately.",
+            "shortness of breath": "Shortness of breath may require urgent evaluation, especially if sudden or severe.",
+            "headache": "Headache causes range from tension to migraines. Seek care if severe, sudden, or with vision changes.",
+            "arm pain": "Arm pain with chest pain could indicate heart issues. Isolated arm pain may be muscular or nerve-related.",
+            "leg pain": "Leg pain with swelling/redness could indicate blood clot. Otherwise may be muscular or joint issue.",
+            "joint pain": "Joint pain may indicate arthritis, injury, or inflammation. Rest and consider anti-inflammatories.",
+            "abdominal pain": "Abdominal pain varies from indigestion to serious conditions. Location and severity matter.",
+            "back pain": "Back pain is common but seek care if with leg weakness, numbness, or bowel/bladder changes."
+        }
+
+        self.follow_up_questions = {
+            "chest pain": ["Does the pain radiate to your arm, jaw, or back?"],
+            "fever": ["What is your temperature?"],
+            "arm pain": ["Is the pain in one or both arms?"]
+        }
+
+        self.drug_database = {
+            "paracetamol": {
+                "uses":"Pain and fever relief",
+                "dosage":"500-1000 mg every 4-6 hours (adult typical); do not exceed 4000 mg/day",
+                "side_effects":"Rare at recommended dose; liver risk in overdose",
+                "precautions":"Avoid heavy alcohol use; check other meds for acetaminophen"
+            },
+            "ibuprofen": {
+                "uses":"Pain, inflammation, fever",
+                "dosage":"200-400 mg every 4-6 hours; max depends on formulation",
+                "side_effects":"Stomach upset, increased bleeding risk, kidney effects",
+                "precautions":"Take with food; avoid if active peptic ulcer or severe kidney disease"
+            },
+            "aspirin": {
+                "uses":"Pain, fever, anti-inflammatory; low-dose for antiplatelet therapy",
+                "dosage":"325-650 mg every 4-6 hours (not for children with viral illness); low-dose 75-100 mg for cardioprotection",
+                "side_effects":"Gastric irritation, bleeding",
+                "precautions":"Not for children with fever (Reye's syndrome), avoid if bleeding risk"
+            },
+            "amoxicillin": {
+                "uses":"Broad-spectrum antibiotic for many bacterial infections",
+                "dosage":"500 mg every 8 hours or 875 mg every 12 hours (typical adult regimens)",
+                "side_effects":"Diarrhea, allergic reaction",
+                "precautions":"Do not use if penicillin allergy"
+            },
+            "clopidogrel": {
+                "uses":"Antiplatelet for stroke/MI prevention",
+                "dosage":"75 mg once daily",
+                "side_effects":"Bleeding",
+                "precautions":"Combine with aspirin only when indicated; bleed risk"
+            }
+        }
+
+        # Brand names and synonyms -> drug_database key
+        self.drug_aliases = {
+            "acetaminophen": "paracetamol",
+            "tylenol": "paracetamol",
+            "advil": "ibuprofen",
+            "motrin": "ibuprofen",
+            "amoxil": "amoxicillin",
+            "plavix": "clopidogrel"
+        }
+
+    def _use_kb(self, kb):
+        if isinstance(kb, (str, os.PathLike)):
+            from .kb import KnowledgeBase
+            kb = KnowledgeBase(kb)
+        self.kb = kb
+        self.emergency_symptoms = kb.emergency_symptoms
+        self.heart_attack_symptoms = {"chest pain", "arm pain", "jaw pain", "shoulder pain"}
+        self.symptom_conditions = kb.symptom_conditions
+        self.symptom_explanations = kb.symptom_explanations
+        self.follow_up_questions = kb.follow_up_questions
+        self.drug_database = kb.drug_database
+        self.drug_aliases = kb.drug_aliases
+
+    # The vocabulary-wide structures are built on first use, so opening a large
+    # knowledge base stays cheap until free text actually has to be matched.
+    @functools.cached_property
+    def symptom_list(self):
+        return self.kb.symptom_names()
+
+    @functools.cached_property
+    def symptom_matcher(self):
+        # Same tokenizer as the chat intent router, so a symptom split by a
+        # newline or several spaces is found on every path.
+        return TokenMatcher(self.symptom_list)
+
+    @functools.cached_property
+    def drug_index(self):
+        return DrugIndex(self.drug_database, self.drug_aliases)
+
+    @functools.cached_property
+    def condition_rules(self):
+        return RuleEngine(self.symptom_conditions)
+
+    @functools.cached_property
+    def intent_router(self):
+        return IntentRouter(self.symptom_list, self.drug_index)
+
+    @functools.cached_property
+    def analysis_cache(self):
+        return AnalysisCache(int(os.environ.get("HEALTHAI_ANALYSIS_CACHE_SIZE", DEFAULT_ANALYSIS_MAXSIZE)))
+
+    @functools.cached_property
+    def triage_cache(self):
+        # Text-free (urgency, matched, recommendations) results of triage().
+        return AnalysisCache(int(os.environ.get("HEALTHAI_ANALYSIS_CACHE_SIZE", DEFAULT_ANALYSIS_MAXSIZE)))
+
+    @functools.cached_property
+    def _symptom_rank(self):
+        return {s: i for i, s in enumerate(self.symptom_list)}
+
+    def extract_symptoms(self, text):
+        if not text:
+            return []
+        return self.symptom_matcher.find_all(text.lower())
+
+    def assess_urgency(self, symptoms):
+        return self._assess([s.lower() for s in symptoms])
+
+    def _assess(self, symptoms_lower):
+        if 'chest pain' in symptoms_lower:
+            heart_related = any(pain in symptoms_lower for pain in ['arm pain', 'jaw pain', 'shoulder pain'])
+            if heart_related:
+                return "HIGH EMERGENCY", "🚨 POSSIBLE HEART ATTACK - Chest pain with arm/jaw pain could indicate cardiac emergency. Call emergency services IMMEDIATELY."
+        
+        emergency_found = [s for s in symptoms_lower if s in self.emergency_symptoms]
+        if emergency_found:
+            return "EMERGENCY", f"🚨 EMERGENCY detected: {', '.join(emergency_found)}. Seek immediate medical care or call emergency services."
+        
+        conditions = self.condition_rules.conditions(symptoms_lower)
+        if conditions:
+            return "URGENT", f"Urgent: {', '.join(conditions)}. Consult healthcare professional soon."
+        
+        return "ROUTINE", "Monitor symptoms and schedule routine checkup if persistent."
+
+    def get_specific_recommendations(self, symptoms):
+        return self._recommend([s.lower() for s in symptoms])
+
+    def _recommend(self, symptoms_lower):
+        recommendations = []
+
+        if 'chest pain' in symptoms_lower and any(pain in symptoms_lower for pain in ['arm pain', 'jaw pain']):
+            return [
+                "Call emergency services IMMEDIATELY",
+                "Do not drive yourself to hospital",
+                "Chew aspirin if available and not allergic",
+                "Stay calm and rest while waiting for help"
+            ]
+        
+        if any(s in symptoms_lower for s in ['fever', 'cough', 'shortness of breath']):
+            recommendations.extend([
+                "Monitor temperature regularly",
+                "Stay hydrated with water and electrolytes",
+                "Rest and avoid strenuous activity",
+                "Use humidifier for cough relief"
+            ])
+        
+        if any(s in symptoms_lower for s in ['headache', 'back pain', 'joint pain']):
+            recommendations.extend([
+                "Rest in comfortable position",
+                "Apply ice or heat as appropriate",
+                "Consider over-the-counter pain relief if suitable",
+                "Avoid activities that worsen pain"
+            ])
+        
+        if not recommendations:
+            recommendations = [
+                "Monitor symptoms for changes",
+                "Stay hydrated and rest",
+                "Schedule doctor appointment if symptoms persist beyond 3 days",
+                "Seek immediate care if symptoms worsen suddenly"
+            ]
+        
+        return recommendations[:4]
+
+    def parse_symptoms(self, input_symptoms):
+        """Normalized (lower-cased) symptom list from a comma list, free text or a list."""
+        if isinstance(input_symptoms, str):
+            if ',' in input_symptoms:
+                return [s.strip().lower() for s in input_symptoms.split(',') if s.strip()]
+            return self.extract_symptoms(input_symptoms)
+        if isinstance(input_symptoms, list):
+            return [s.strip().lower() for s in input_symptoms if s and isinstance(s, str)]
+        return []
+
+    def triage(self, input_symptoms):
+        """``analyze_symptoms`` without the explanatory text: urgency, matched
+        symptoms and recommendations only (used by the bulk pipeline). Cached
+        per symptom set apart from the full analyses, so a miss builds no
+        message text."""
+        symptoms = self.parse_symptoms(input_symptoms)
+        if not symptoms:
+            return NO_SYMPTOM_ANALYSIS.triage_dict()
+        key = frozenset(symptoms)
+        cache = self.triage_cache
+        result = cache.get(key)
+        if result is None:
+            matched = self._canonical_order(key)
+            result = (self._assess(matched)[0], tuple(matched), tuple(self._recommend(matched)))
+            cache.put(key, result)
+        urgency, matched, recommendations = result
+        return {"urgency": urgency, "matched": list(matched), "recommendations": list(recommendations)}
+
+    @timed("analyze_symptoms")
+    def analyze_symptoms(self, input_symptoms):
+        return self.analysis(self.parse_symptoms(input_symptoms)).as_dict()
+
+    def analysis(self, symptoms):
+        """Cached ``Analysis`` of a parsed symptom list.
+
+        The analysis depends only on which symptoms were reported: the key is
+        their frozenset and the text lists them in vocabulary order (symptoms
+        outside the vocabulary last, alphabetically), so "cough, fever" and
+        "fever, cough, fever" share one entry.
+        """
+        if not symptoms:
+            return NO_SYMPTOM_ANALYSIS
+        key = frozenset(symptoms)
+        cache = self.analysis_cache
+        analysis = cache.get(key)
+        if analysis is None:
+            analysis = self._analyze(self._canonical_order(key))
+            cache.put(key, analysis)
+        return analysis
+
+    def _canonical_order(self, symptoms):
+        rank = self._symptom_rank
+        unknown = len(rank)
+        return sorted(symptoms, key=lambda s: (rank.get(s, unknown), s))
+
+    def precompute_analyses(self, combinations=None):
+        """Fill the analysis cache ahead of traffic. By default: every single
+        symptom and every condition rule's symptom set, up to the cache size.
+        Returns the number of entries computed."""
+        if combinations is None:
+            combinations = itertools.chain(([s] for s in self.symptom_list),
+                                           (key.split("+") for key in self.symptom_conditions))
+        cache = self.analysis_cache
+        added = 0
+        for symptoms in itertools.islice(combinations, cache.maxsize):
+            key = frozenset(s.strip().lower() for s in symptoms if s.strip())
+            if key and key not in cache:
+                cache.put(key, self._analyze(self._canonical_order(key)))
+                added += 1
+        return added
+
+    def _analyze(self, symptoms):
+        steps = self._analysis_steps(symptoms)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as done:
+                return done.value
+
+    def _analysis_steps(self, symptoms):
+        """Yield ``Analysis.events`` as each is computed, urgency first, and
+        return the finished ``Analysis``."""
+        urgency_level, urgency_message = self._assess(symptoms)
+        yield "urgency", urgency_level
+        yield "message", urgency_message
+
+        explanation_parts = []
+        for symptom in symptoms:
+            if symptom in self.symptom_explanations:
+                explanation_parts.append(self.symptom_explanations[symptom])
+            else:
+                explanation_parts.append(f"{symptom.capitalize()} should be evaluated by a healthcare professional if persistent or severe.")
+
+        detailed_message = f"\n\nDetected symptoms: {', '.join(symptoms)}.\n\n" + " ".join(explanation_parts)
+        yield "message", detailed_message
+
+        recommendations = self._recommend(symptoms)
+        yield "recommendations", list(recommendations)
+
+        follow_up = ""
+        if urgency_level in ["ROUTINE", "URGENT"]:
+            for symptom in symptoms:
+                if symptom in self.follow_up_questions:
+                    follow_up = "\n\n**To help assess better:** " + self.follow_up_questions[symptom][0]
+                    break
+        if follow_up:
+            yield "message", follow_up
+        yield "matched", list(symptoms)
+
+        return Analysis(urgency_level, urgency_message, recommendations, symptoms,
+                        detailed_message, follow_up)
+
+    def analysis_events(self, symptoms):
+        """``analysis(symptoms).events()``, but a symptom set that is not
+        cached yet is yielded while it is computed (and cached once done)."""
+        if not symptoms:
+            yield from NO_SYMPTOM_ANALYSIS.events()
+            return
+        key = frozenset(symptoms)
+        cache = self.analysis_cache
+        analysis = cache.get(key)
+        if analysis is not None:
+            yield from analysis.events()
+            return
+        analysis = yield from self._analysis_steps(self._canonical_order(key))
+        cache.put(key, analysis)
+
+    def stream_symptoms(self, input_symptoms):
+        """``analyze_symptoms`` as a generator of ``(field, value)`` pairs:
+        ``urgency`` first, then ``message`` parts (urgency message,
+        explanations), ``recommendations``, the follow-up ``message`` part and
+        ``matched``. Joining the message parts and keeping the other fields
+        gives the ``analyze_symptoms`` dict."""
+        return self.analysis_events(self.parse_symptoms(input_symptoms))
+
+    async def astream_symptoms(self, input_symptoms):
+        """``stream_symptoms`` for asyncio code; yields to the event loop
+        between fields."""
+        for event in self.stream_symptoms(input_symptoms):
+            yield event
+            await asyncio.sleep(0)
+
+    def _drug_record(self, name):
+        d = self.drug_database[name]
+        return {
+            "name": name.title(),
+            "uses": d["uses"],
+            "dosage": d["dosage"],
+            "side_effects": d["side_effects"],
+            "precautions": d["precautions"]
+        }
+
+    @timed("get_drug_info")
+    def get_drug_info(self, query):
+        q = normalize(query)
+        if not q:
+            return None
+        exact = self.drug_aliases.get(q, q)
+        if exact in self.drug_database:
+            return self._drug_record(exact)
+        # Partial names match drug names only, not aliases ("a" must not
+        # pull in every drug with an alias containing an "a").
+        matches = self.drug_index.substring(q, aliases=False)
+        if len(matches) == 1:
+            return self._drug_record(matches[0])
+        elif len(matches) > 1:
+            return {"multiple": [m.title() for m in matches]}
+        else:
+            return None
+
+    def suggest_drugs(self, query, limit=5):
+        """Closest drug names for a query that matched nothing (typos)."""
+        return [name.title() for name in self.drug_index.fuzzy(query, limit)]
+
+    def load_formulary(self, path):
+        """Merge a formulary CSV (see ``healthai.drugs.load_formulary``) into the drug database."""
+        database, aliases = load_formulary(path)
+        self.drug_database = collections.ChainMap(database, self.drug_database)
+        self.drug_aliases = collections.ChainMap(aliases, self.drug_aliases)
+        self.__dict__.pop("drug_index", None)
+        self.__dict__.pop("intent_router", None)
+
+    @timed("generate_response")
+    def generate_response(self, user_input, chat_history=None):
+        reply, symptoms = self._route(user_input)
+        return reply if symptoms is None else self.analysis(symptoms).reply
+
+    def stream_response(self, user_input, chat_history=None):
+        """``generate_response`` as a generator of markdown sections. Symptom
+        analyses arrive urgency first (an emergency is always in the first
+        section), then explanation, recommendations and follow-up; every
+        other reply is a single section."""
+        reply, symptoms = self._route(user_input)
+        if symptoms is None:
+            yield reply
+        else:
+            yield from reply_sections(self.analysis_events(symptoms))
+
+    async def astream_response(self, user_input, chat_history=None):
+        """``stream_response`` for asyncio code; yields to the event loop
+        between sections."""
+        for section in self.stream_response(user_input, chat_history):
+            yield section
+            await asyncio.sleep(0)
+
+    def _route(self, user_input):
+        """``(reply, None)`` for a finished reply, or ``(None, symptoms)`` when
+        the message is answered by the analysis of ``symptoms``."""
+        if not user_input or not isinstance(user_input, str):
+            return "Please type a message.", None
+
+        intents = self.intent_router.route(user_input)
+
+        if intents.greeting:
+            return "Hello! I'm HealthAI — I can help analyze symptoms, give medication information (educational), and provide general health tips. How may I assist you?", None
+
+        if intents.drug in self.drug_database:
+            info = self._drug_record(intents.drug)
+            return (f"**{info['name']}**\n\n**Uses:** {info['uses']}\n**Typical dosage:** {info['dosage']}\n**Side effects:** {info['side_effects']}\n**Precautions:** {info['precautions']}"), None
+
+        if intents.emergency:
+            return "🚨 If this is an emergency, call your local emergency number right away. I am not a replacement for emergency care.", None
+
+        if "," in user_input or intents.symptoms:
+            # A comma list is taken item by item; otherwise the router already
+            # found the symptoms in the text.
+            return None, self.parse_symptoms(user_input) if "," in user_input else intents.symptoms
+
+        if intents.advice:
+            tips = [
+                "Stay hydrated (8 glasses of water daily) and get 7-9 hours of quality sleep.",
+                "Eat a balanced diet with plenty of vegetables, lean protein, and whole grains.",
+                "Aim for 150 minutes of moderate exercise weekly for heart health.",
+                "Manage stress through meditation, deep breathing, or enjoyable hobbies.",
+            ]
+            return f"**Health Tip:** {random.choice(tips)}", None
+
+        fallbacks = [
+            "I can help with symptom analysis, medication info, and general health tips. What would you like?",
+            "Ask me about symptoms (e.g., 'fever, cough, chest pain'), or ask for medication info (e.g., 'paracetamol').",
+        ]
+        return random.choice(fallbacks), None
+
+
+_default_chatbot = None
+
+
+def get_chatbot():
+    """Return the process-wide HealthcareChatbot, building it on first use.
+    ``HEALTHAI_KB`` points it at a knowledge-base file instead of the built-in data;
+    ``HEALTHAI_ANALYSIS_PRECOMPUTE=1`` fills its analysis cache up front."""
+    global _default_chatbot
+    if _default_chatbot is None:
+        bot = HealthcareChatbot(kb=os.environ.get("HEALTHAI_KB") or None)
+        if os.environ.get("HEALTHAI_ANALYSIS_PRECOMPUTE", "").lower() in ("1", "true", "yes", "on"):
+            bot.precompute_analyses()
+        register_collector("analysis_cache", bot.analysis_cache.stats)
+        register_collector("triage_cache", bot.triage_cache.stats)
+        _default_chatbot = bot
+    return _default_chatbot
+
+
+def analyze_symptoms(input_symptoms):
+    return get_chatbot().analyze_symptoms(input_symptoms)
+
+
+def get_drug_info(query):
+    return get_chatbot().get_drug_info(query)
+
+
+def generate_response(user_input, chat_history=None):
+    return get_chatbot().generate_response(user_input, chat_history)
+
+
+def stream_response(user_input, chat_history=None):
+    return get_chatbot().stream_response(user_input, chat_history)
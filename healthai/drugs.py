@@ -0,0 +1,195 @@
+# drugs.py - indexed drug-name lookup: exact, prefix, substring, fuzzy and
+# detection of drug names inside free text
+#
+# Keys are normalized names plus any brand names / synonyms, each pointing
+# at a canonical drug name. The index keeps:
+#   - a sorted key list for prefix search (bisect),
+#   - a trigram -> key-id inverted index for substring and fuzzy search,
+#   - one compiled PhraseMatcher for spotting names in chat text, built
+#     only when text is first searched (chat routing has its own matcher).
+# Everything is built lazily on first use and rebuilt after ``add``.
+import bisect
+import collections
+import csv
+import heapq
+
+from .text import PhraseMatcher
+
+DRUG_FIELDS = ("uses", "dosage", "side_effects", "precautions")
+
+# Postings longer than this are skipped when ranking fuzzy candidates; such
+# trigrams ("ine", "in ") say little about which drug was meant.
+_COMMON_GRAM = 2000
+
+
+def normalize(name):
+    return " ".join(name.strip().lower().split())
+
+
+def _trigrams(s):
+    s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def edit_distance(a, b, limit=None):
+    """Levenshtein distance; stops early once every path exceeds ``limit``."""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class DrugIndex:
+    """Name index over a drug database (canonical name -> info dict)."""
+
+    def __init__(self, names=(), aliases=None):
+        self._canonical = {}     # key -> canonical name
+        self._rank = {}          # canonical name -> insertion order
+        self._dirty = True
+        for name in names:
+            self.add(name)
+        for alias, name in (aliases or {}).items():
+            self.add(name, [alias])
+
+    def __len__(self):
+        return len(self._rank)
+
+    def add(self, name, aliases=()):
+        canonical = normalize(name)
+        self._rank.setdefault(canonical, len(self._rank))
+        for key in (canonical, *map(normalize, aliases)):
+            if key:
+                self._canonical.setdefault(key, canonical)
+        self._dirty = True
+
+    def _build(self):
+        self._keys = sorted(self._canonical)
+        postings = collections.defaultdict(list)
+        for i, key in enumerate(self._keys):
+            for gram in _trigrams(key):
+                postings[gram].append(i)
+        self._postings = dict(postings)
+        self._matcher = None
+        self._dirty = False
+
+    def _ensure_built(self):
+        if self._dirty:
+            self._build()
+
+    def _text_matcher(self):
+        self._ensure_built()
+        if self._matcher is None:
+            self._matcher = PhraseMatcher(sorted(self._keys, key=len, reverse=True))
+        return self._matcher
+
+    def _ordered(self, keys):
+        names = {self._canonical[k] for k in keys}
+        return sorted(names, key=self._rank.__getitem__)
+
+    def keys(self):
+        """Every normalized name and alias the index knows."""
+        return self._canonical.keys()
+
+    # --- lookups ----------------------------------------------------------
+    def exact(self, query):
+        return self._canonical.get(normalize(query))
+
+    def prefix(self, query, limit=20):
+        """Canonical names with a name or alias starting with ``query``."""
+        self._ensure_built()
+        q = normalize(query)
+        if not q:
+            return []
+        i = bisect.bisect_left(self._keys, q)
+        hits = []
+        while i < len(self._keys) and self._keys[i].startswith(q) and len(hits) < limit:
+            hits.append(self._keys[i])
+            i += 1
+        return self._ordered(hits)
+
+    def substring(self, query, aliases=True):
+        """Canonical names with a name or alias containing ``query``; with
+        ``aliases=False`` only the canonical names themselves are searched.
+
+        Queries of three characters or more go through the trigram index.
+        Shorter ones are scanned linearly; on a large formulary they match
+        most names anyway.
+        """
+        self._ensure_built()
+        q = normalize(query)
+        if not q:
+            return []
+        canonical = self._canonical
+        if len(q) < 3:
+            return self._ordered(k for k in self._keys if q in k and (aliases or canonical[k] == k))
+        grams = {q[i:i + 3] for i in range(len(q) - 2)}
+        lists = sorted((self._postings.get(g, ()) for g in grams), key=len)
+        if not lists[0]:
+            return []
+        candidates = set(lists[0])
+        for ids in lists[1:]:
+            candidates.intersection_update(ids)
+            if not candidates:
+                return []
+        keys = (self._keys[i] for i in candidates)
+        return self._ordered(k for k in keys if q in k and (aliases or canonical[k] == k))
+
+    def fuzzy(self, query, limit=5, max_distance=None):
+        """Closest canonical names by edit distance, for misspelled queries."""
+        self._ensure_built()
+        q = normalize(query)
+        if not q:
+            return []
+        if max_distance is None:
+            max_distance = max(1, len(q) // 3)
+        grams = _trigrams(q)
+        scores = collections.Counter()
+        postings = [self._postings.get(g, ()) for g in grams]
+        rare = [p for p in postings if len(p) <= _COMMON_GRAM] or postings
+        for ids in rare:
+            scores.update(ids)
+        best = {}
+        for i, _ in heapq.nlargest(limit * 4, scores.items(), key=lambda kv: kv[1]):
+            key = self._keys[i]
+            d = edit_distance(q, key, max_distance)
+            if d <= max_distance:
+                name = self._canonical[key]
+                best[name] = min(d, best.get(name, d))
+        ranked = sorted(best, key=lambda n: (best[n], self._rank[n]))
+        return ranked[:limit]
+
+    def find_in_text(self, text):
+        """Canonical name of the first drug mentioned in ``text``, or None."""
+        key = self._text_matcher().find_first(normalize(text))
+        return self._canonical[key] if key else None
+
+    def find_all_in_text(self, text):
+        return self._ordered(self._text_matcher().find_all(normalize(text)))
+
+
+def load_formulary(path):
+    """Read a formulary CSV with columns name, uses, dosage, side_effects,
+    precautions and optional ``aliases`` (separated by ``;``).
+
+    Returns ``(drug_database, aliases)`` shaped like HealthcareChatbot's.
+    """
+    database, aliases = {}, {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            name = normalize(row["name"])
+            if not name:
+                continue
+            database[name] = {field: (row.get(field) or "").strip() for field in DRUG_FIELDS}
+            for alias in (row.get("aliases") or "").split(";"):
+                if normalize(alias):
+                    aliases[normalize(alias)] = name
+    return database, aliases
@@ -0,0 +1,188 @@
+# encoder.py - columnar feature encoding for the heart-disease model
+#
+# HeartFeatureEncoder owns the model's input schema (model.FEATURE_SCHEMA):
+# the column order, the label -> code map of every categorical input and
+# the range of values each column accepts. Single records and whole
+# columnar batches are written straight into a float64 buffer - one pass
+# per column, no DataFrame per row or per chunk.
+#
+# check_model() compares the schema with a fitted model's feature_names_in_
+# once per model (the registry calls it at load time). model_input() then
+# hands a model fitted on named columns its rows as a DataFrame with those
+# names, and every other model (compiled forests) the plain array.
+import math
+import threading
+import weakref
+
+import numpy as np
+
+from .model import FEATURE_SCHEMA
+
+
+class HeartFeatureEncoder:
+    """Encode patients (UI labels or numeric codes) into the model's matrix.
+
+    ``encode``/``encode_values`` take one record, ``encode_columns`` a
+    mapping of column name to array-like (a DataFrame, a dict of lists or
+    arrays). All of them accept an ``out`` buffer to write into and raise
+    ``ValueError`` for missing columns, unknown labels and values outside
+    the schema's ranges. Missing numbers (NaN) pass through to the model.
+    """
+
+    def __init__(self, schema=FEATURE_SCHEMA):
+        self.schema = tuple(schema)
+        self.feature_names = [name for name, _, _, _ in self.schema]
+        self.n_features = len(self.schema)
+        self.low = np.array([low for _, _, low, _ in self.schema], dtype=np.float64)
+        self.high = np.array([high for _, _, _, high in self.schema], dtype=np.float64)
+        # Per column: label -> code, or None for numeric inputs. Codes written
+        # as text ("0", "2") are accepted too, as the batch files carry both.
+        self._codes = []
+        for name, options, low, high in self.schema:
+            if options is None:
+                self._codes.append(None)
+                continue
+            codes = {label: float(i) for i, label in enumerate(options)}
+            codes.update((str(i), float(i)) for i in range(int(low), int(high) + 1))
+            self._codes.append(codes)
+        self._columns = list(zip(self.feature_names, self._codes, self.low.tolist(), self.high.tolist()))
+        self._checked = weakref.WeakSet()
+
+    # --- single records ---------------------------------------------------
+    def encode_values(self, *values, out=None):
+        """Encode one record given positionally, in ``feature_names`` order."""
+        if len(values) != self.n_features:
+            raise ValueError(f"expected {self.n_features} values in order {self.feature_names}, got {len(values)}")
+        row = np.empty(self.n_features, dtype=np.float64) if out is None else out
+        for j, (value, (name, codes, low, high)) in enumerate(zip(values, self._columns)):
+            if codes is not None and isinstance(value, str):
+                code = codes.get(value)
+                if code is None:
+                    code = codes.get(value.strip())
+                    if code is None:
+                        raise ValueError(f"unknown value {value!r} for {name!r}; expected one of "
+                                         f"{self.schema[j][1]}")
+                value = code
+            else:
+                value = float(value)
+                if not low <= value <= high and not math.isnan(value):
+                    raise ValueError(f"{name}={value:g} is outside [{low:g}, {high:g}]")
+            row[j] = value
+        return row
+
+    def encode(self, record, out=None):
+        """Encode one ``{feature: value}`` mapping."""
+        try:
+            values = [record[name] for name in self.feature_names]
+        except KeyError as e:
+            raise ValueError(f"missing feature {e.args[0]!r}") from None
+        return self.encode_values(*values, out=out)
+
+    def as_matrix(self, features):
+        """An encoded row (or rows) as the C-contiguous float64 matrix the
+        model is fed; no copy when it already is one."""
+        X = np.asarray(features, dtype=np.float64)
+        return X.reshape(-1, self.n_features) if X.ndim == 1 else X
+
+    # --- columnar batches -----------------------------------------------
+    def encode_columns(self, columns, out=None):
+        """Encode a batch into an ``(n, n_features)`` float64 array.
+
+        ``out`` may be a preallocated buffer with at least ``n`` rows (reused
+        across chunks by ``batch.score_file``); its first ``n`` rows are
+        filled and returned.
+        """
+        missing = [name for name in self.feature_names if name not in columns]
+        if missing:
+            raise ValueError(f"missing feature columns: {', '.join(missing)}")
+        n = len(columns[self.feature_names[0]])
+        if out is None:
+            X = np.empty((n, self.n_features), dtype=np.float64)
+        elif out.shape[0] < n or out.shape[1] != self.n_features:
+            raise ValueError(f"buffer of shape {out.shape} cannot hold {n} rows of {self.n_features} features")
+        else:
+            X = out[:n]
+        for j in range(self.n_features):
+            X[:, j] = self._encode_column(j, columns[self.feature_names[j]])
+        return X
+
+    def _encode_column(self, j, column):
+        name, codes, low, high = self._columns[j]
+        values = np.asarray(column)
+        if values.dtype.kind not in 'biuf':
+            if codes is not None:
+                return self._encode_labels(j, values)
+            import pandas as pd
+
+            values = pd.to_numeric(pd.Series(values, copy=False), errors='raise').to_numpy(dtype=np.float64)
+        # Checked on the contiguous source column; fmin/fmax skip NaN, so
+        # missing values don't hide bad ones.
+        if len(values) and (np.fmin.reduce(values) < low or np.fmax.reduce(values) > high):
+            bad = np.flatnonzero((values < low) | (values > high))[0]
+            raise ValueError(f"value {values[bad]:g} in column {name!r} (row {bad}) is outside "
+                             f"[{low:g}, {high:g}]")
+        return values
+
+    def _encode_labels(self, j, values):
+        import pandas as pd
+
+        name, codes, low, high = self._columns[j]
+        # Labels repeat heavily: map each distinct value once, then gather.
+        positions, uniques = pd.factorize(values, use_na_sentinel=True)
+        table = np.empty(len(uniques), dtype=np.float64)
+        for i, label in enumerate(uniques):
+            code = codes.get(str(label).strip())
+            if code is None and isinstance(label, (int, float)) and low <= label <= high:
+                code = float(label)
+            if code is None:
+                raise ValueError(f"unknown value {label!r} in column {name!r}; "
+                                 f"expected one of {self.schema[j][1]}")
+            table[i] = code
+        if (positions < 0).any():
+            raise ValueError(f"missing value in column {name!r}; expected one of {self.schema[j][1]}")
+        return table[positions]
+
+    # --- models -----------------------------------------------------------
+    def check_model(self, model):
+        """Raise ``ValueError`` unless ``model`` takes this encoder's columns
+        in this order. Each model object is checked once."""
+        if model in self._checked:
+            return
+        sklearn_names = getattr(model, 'feature_names_in_', None)
+        # CompiledForest (and .hforest exports) carry the names as feature_names.
+        names = sklearn_names if sklearn_names is not None else getattr(model, 'feature_names', None)
+        if names is not None and list(names) != self.feature_names:
+            raise ValueError(f"model was fitted on columns {list(names)}, "
+                             f"but the encoder produces {self.feature_names}")
+        n_features = getattr(model, 'n_features_in_', getattr(model, 'n_features', self.n_features))
+        if n_features != self.n_features:
+            raise ValueError(f"model expects {n_features} features, but the encoder produces {self.n_features}")
+        try:
+            self._checked.add(model)
+        except TypeError:
+            pass  # not weak-referenceable: checked again next time
+
+    def model_input(self, model, X):
+        """The encoded matrix ``X`` as ``model`` takes it: a DataFrame with
+        the fitted column names for models that have ``feature_names_in_``
+        (sklearn warns about plain arrays otherwise), ``X`` itself for the rest."""
+        names = getattr(model, 'feature_names_in_', None)
+        if names is None:
+            return X
+        import pandas as pd
+
+        return pd.DataFrame(X, columns=names, copy=False)
+
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder():
+    """The process-wide ``HeartFeatureEncoder`` for ``model.FEATURE_SCHEMA``."""
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = HeartFeatureEncoder()
+    return _encoder
@@ -0,0 +1,107 @@
+# explain.py - per-patient attributions for the heart-disease forest
+#
+# Path attribution (Saabas): every node of a tree stores the class mix of
+# the training rows that reached it. Walking a row from the root to its leaf,
+# each split moves the disease probability from the parent's value to the
+# child's, and that change is credited to the split's feature. Summed over
+# the path and averaged over the trees, the credits plus the forest's base
+# rate add up exactly to the predicted probability.
+#
+# The walk reuses CompiledForest's flat node arrays: all (row, tree) pairs
+# step down together for max_depth steps, and each step's credits are
+# accumulated per (row, feature) with one bincount, so a whole cohort is
+# explained with a few NumPy calls per tree level.
+#
+# Usage (cohort):
+#   python -m healthai.batch patients.csv -o explained.csv --explain
+import numpy as np
+
+from .forest import compile_forest
+from .model import FEATURE_NAMES
+
+# Rows per internal block: keeps the (rows x trees) working arrays in cache.
+DEFAULT_BLOCK = 512
+
+
+class ForestExplainer:
+    """Attributions and importances for one loaded tree-ensemble model.
+
+    Built once per model (the app caches it by registry digest). The global
+    importance ranking is computed here, not on every request.
+    """
+
+    def __init__(self, model, feature_names=FEATURE_NAMES, positive_class=1):
+        self.forest = compile_forest(model)
+        self.feature_names = list(feature_names)
+        classes = list(self.forest.classes_)
+        self.class_index = classes.index(positive_class) if positive_class in classes else len(classes) - 1
+        self._node_value = np.ascontiguousarray(self.forest.value[:, self.class_index])
+        self.base_value = float(self._node_value[self.forest.roots].mean())
+        importances = getattr(self.forest, 'feature_importances_', None)
+        if importances is None:
+            importances = getattr(model, 'feature_importances_', None)
+        if importances is None:
+            self.global_importances = []
+        else:
+            self.global_importances = sorted(zip(self.feature_names, (float(v) for v in importances)),
+                                             key=lambda p: p[1], reverse=True)
+
+    def contributions(self, X, block=DEFAULT_BLOCK):
+        """``(n_rows, n_features)`` probability credits per feature. Each row
+        sums to ``predict_proba(X)[:, positive] - base_value``."""
+        return self.attribute(X, block)[1]
+
+    def attribute(self, X, block=DEFAULT_BLOCK):
+        """``(proba, credits)``: the forest's ``predict_proba`` and the
+        per-feature credits, from the same walk down the trees."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        proba = np.empty((len(X), len(self.forest.classes_)), dtype=np.float64)
+        credits = np.empty((len(X), self.forest.n_features), dtype=np.float64)
+        for start in range(0, len(X), block):
+            stop = start + block
+            credits[start:stop], leaves = self._contributions(X[start:stop])
+            proba[start:stop] = self.forest.value[leaves].mean(axis=1)
+        return proba, credits
+
+    def _contributions(self, X):
+        forest = self.forest
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_cols = X.shape
+        if n_cols != forest.n_features:
+            raise ValueError(f"X has {n_cols} features, but the forest expects {forest.n_features}")
+        flat = X.ravel()
+        # Indexes both the input row's values and its credit bins.
+        row_base = (np.arange(n_rows, dtype=np.intp) * n_cols)[:, None]
+        node = np.broadcast_to(forest.roots, (n_rows, forest.n_trees)).copy()
+        value = self._node_value
+        children = forest._children
+        totals = np.zeros(n_rows * n_cols, dtype=np.float64)
+        has_missing = forest._has_missing(flat)
+        for _ in range(forest.max_depth):
+            feature = forest.feature[node]
+            go_right = forest._go_right(flat[row_base + feature], node, has_missing)
+            child = children[2 * node + go_right]
+            # Leaves point at themselves, so finished paths add zero.
+            totals += np.bincount((row_base + feature).ravel(), weights=(value[child] - value[node]).ravel(),
+                                  minlength=totals.size)
+            node = child
+        return totals.reshape(n_rows, n_cols) / forest.n_trees, node
+
+    def explain(self, features, n=5):
+        """Top ``n`` features for one encoded row as ``[(feature, credit)]``,
+        largest absolute credit first; positive credits raise the risk."""
+        credits = self.contributions(features)[0]
+        order = np.argsort(-np.abs(credits), kind='stable')[:n]
+        return [(self.feature_names[i], float(credits[i])) for i in order]
+
+    def top_importances(self, n=5):
+        return self.global_importances[:n]
+
+
+def explain_array(explainer, X):
+    """``(labels, proba, credits)`` for an encoded matrix; labels are the
+    argmax class, as ``batch.score_array`` derives them."""
+    proba, credits = explainer.attribute(X)
+    return explainer.forest.classes_.take(proba.argmax(axis=1)), proba, credits
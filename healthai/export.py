@@ -0,0 +1,227 @@
+# export.py - pickle-free model files for the heart-disease forest
+#
+# A ``.hforest`` file holds a CompiledForest's node arrays in a raw,
+# versioned layout:
+#
+#   magic "HFOREST\0" | format version (u32 LE) | header length (u32 LE)
+#   | JSON header | padding | arrays, each starting on a 64-byte boundary
+#
+# The header lists every array's dtype, shape and offset plus the forest's
+# scalars (classes, feature names, depth). Loading maps the file and views
+# the float arrays in place - no pickle is executed and neither joblib nor
+# scikit-learn is imported, so a cold worker is ready in milliseconds and
+# processes serving the same file share its pages. A file from an untrusted
+# path can at worst fail to load; it cannot run code.
+#
+# Usage:
+#   python -m healthai.export                          # auto-detected model -> <name>.hforest
+#   python -m healthai.export model.joblib -o model.hforest
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+from .forest import CompiledForest, compile_forest
+
+MAGIC = b"HFOREST\x00"
+FORMAT_VERSION = 2
+# Version 1 lacks the missing-value branch of each split; its forests load
+# but refuse rows with NaN.
+READ_VERSIONS = (1, 2)
+FOREST_EXTENSION = ".hforest"
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGN = 64
+
+# On-disk dtypes. Node indexes fit in 32 bits; thresholds and class mixes
+# keep float64 so exported forests score exactly like the source model.
+_ARRAYS = {
+    "feature": "<i4",
+    "threshold": "<f8",
+    "left": "<i4",
+    "right": "<i4",
+    "value": "<f8",
+    "roots": "<i4",
+    "feature_importances": "<f8",
+    "missing_left": "|u1",
+}
+_HEADER_KEYS = ("n_features", "max_depth", "classes", "feature_names", "arrays")
+_ARRAY_KEYS = ("dtype", "shape", "offset")
+
+
+def _aligned(n):
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def save_forest(forest, path, source=None):
+    """Write ``forest`` (a ``CompiledForest`` or a fitted sklearn forest) to
+    ``path``. ``source`` is free-form provenance stored in the header.
+    Returns the number of bytes written."""
+    forest = compile_forest(forest)
+    arrays = {"feature": forest.feature, "threshold": forest.threshold, "left": forest.left,
+              "right": forest.right, "value": forest.value, "roots": forest.roots}
+    if getattr(forest, "feature_importances_", None) is not None:
+        arrays["feature_importances"] = forest.feature_importances_
+    if forest.missing_left is not None:
+        arrays["missing_left"] = forest.missing_left
+    if forest.node_count >= 2 ** 31:
+        raise ValueError("forest too large for the 32-bit node indexes of the forest file format")
+    arrays = {name: np.ascontiguousarray(a, dtype=_ARRAYS[name]) for name, a in arrays.items()}
+
+    classes = forest.classes_.tolist()
+    header = {"format": FORMAT_VERSION, "n_features": forest.n_features, "max_depth": forest.max_depth,
+              "classes": classes, "feature_names": forest.feature_names, "source": source, "arrays": {}}
+    # Offsets depend on the header's length, which depends on the offsets:
+    # lay out with a placeholder length, then fix up until it is stable.
+    start = 0
+    while True:
+        offset = start
+        for name, a in arrays.items():
+            header["arrays"][name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+            offset = _aligned(offset + a.nbytes)
+        blob = json.dumps(header, separators=(",", ":")).encode()
+        first = _aligned(_PREAMBLE.size + len(blob))
+        if first == start:
+            break
+        start = first
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(blob)))
+        f.write(blob)
+        for name, a in arrays.items():
+            f.seek(header["arrays"][name]["offset"])
+            f.write(a.tobytes())
+        size = f.tell()
+    os.replace(tmp, path)
+    return size
+
+
+def read_header(path):
+    """The JSON header of a ``.hforest`` file; ``ValueError`` if it isn't one."""
+    with open(path, "rb") as f:
+        return _parse_header(f.read(_PREAMBLE.size), f, path)
+
+
+def _parse_header(preamble, f, path):
+    if len(preamble) < _PREAMBLE.size:
+        raise ValueError("not a HealthAI forest file (too short)")
+    magic, version, length = _PREAMBLE.unpack(preamble)
+    if magic != MAGIC:
+        raise ValueError("not a HealthAI forest file (bad magic)")
+    if version not in READ_VERSIONS:
+        raise ValueError(f"unsupported forest file version {version} (this build reads "
+                         f"{', '.join(map(str, READ_VERSIONS))})")
+    header = json.loads(f.read(length))
+    name = os.path.basename(path)
+    if not isinstance(header, dict):
+        raise ValueError(f"{name}: forest file header is not a JSON object")
+    missing = [key for key in _HEADER_KEYS if key not in header]
+    if missing:
+        raise ValueError(f"{name}: forest file header lacks {', '.join(missing)}")
+    if not isinstance(header["arrays"], dict):
+        raise ValueError(f"{name}: forest file header has no array table")
+    for array, spec in header["arrays"].items():
+        if not isinstance(spec, dict) or any(key not in spec for key in _ARRAY_KEYS):
+            raise ValueError(f"{name}: forest file header entry for {array!r} lacks "
+                             f"{', '.join(_ARRAY_KEYS)}")
+    return header
+
+
+def load_forest(path, mmap_mode=True):
+    """Load a ``.hforest`` file as a ``CompiledForest``.
+
+    With ``mmap_mode`` the float arrays are read-only views of the mapped
+    file; otherwise the file is read into memory. Raises ``ValueError`` for
+    files that are not valid forest files.
+    """
+    with open(path, "rb") as f:
+        header = _parse_header(f.read(_PREAMBLE.size), f, path)
+        if mmap_mode:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            f.seek(0)
+            buffer = f.read()
+
+    missing = {"feature", "threshold", "left", "right", "value", "roots"} - set(header["arrays"])
+    if missing:
+        raise ValueError(f"forest file lacks arrays: {', '.join(sorted(missing))}")
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        if name not in _ARRAYS or spec["dtype"] != np.dtype(_ARRAYS[name]).str:
+            raise ValueError(f"unexpected array {name!r} ({spec['dtype']}) in forest file")
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        if spec["offset"] < 0 or spec["offset"] + count * dtype.itemsize > len(buffer):
+            raise ValueError(f"array {name!r} runs past the end of the forest file")
+        arrays[name] = np.frombuffer(buffer, dtype, count, spec["offset"]).reshape(spec["shape"])
+
+    n_nodes = len(arrays["feature"])
+    n_classes = len(header["classes"])
+    if (arrays["value"].shape != (n_nodes, n_classes) or len(arrays["left"]) != n_nodes
+            or len(arrays["right"]) != n_nodes or len(arrays["threshold"]) != n_nodes):
+        raise ValueError("inconsistent array shapes in forest file")
+    if "missing_left" in arrays and len(arrays["missing_left"]) != n_nodes:
+        raise ValueError("inconsistent array shapes in forest file")
+    # Index arrays are widened to the platform's index type (a small copy);
+    # out-of-range indexes would only surface later as IndexErrors, so
+    # they are rejected here.
+    index = {name: arrays[name].astype(np.intp) for name in ("feature", "left", "right", "roots")}
+    for name in ("left", "right", "roots"):
+        if len(index[name]) and (index[name].min() < 0 or index[name].max() >= n_nodes):
+            raise ValueError(f"node index out of range in {name!r}")
+    if n_nodes and (index["feature"].min() < 0 or index["feature"].max() >= header["n_features"]):
+        raise ValueError("feature index out of range in forest file")
+    return CompiledForest(
+        feature=index["feature"], threshold=arrays["threshold"], left=index["left"], right=index["right"],
+        value=arrays["value"], roots=index["roots"], max_depth=header["max_depth"],
+        classes=np.asarray(header["classes"]), n_features=header["n_features"],
+        feature_names=header["feature_names"], feature_importances=arrays.get("feature_importances"),
+        missing_left=arrays.get("missing_left"))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m healthai.export",
+                                 description="Export the heart-disease model to a pickle-free .hforest file.")
+    ap.add_argument("model", nargs="?", help="model file (default: auto-detect in the current directory)")
+    ap.add_argument("-o", "--output", help=f"output path (default: the model's name with {FOREST_EXTENSION})")
+    ap.add_argument("--check-rows", type=int, default=2_000,
+                    help="random rows scored by both models to verify the export (0 = skip)")
+    args = ap.parse_args(argv)
+
+    from .encoder import get_encoder
+    from .model import find_model_file, read_model
+    from .registry import file_digest
+
+    path = args.model or find_model_file()
+    if path is None:
+        ap.error("no model file found")
+    if path.lower().endswith(FOREST_EXTENSION):
+        ap.error(f"{path} is already a {FOREST_EXTENSION} file")
+    output = args.output or os.path.splitext(path)[0] + FOREST_EXTENSION
+    model = read_model(path)
+    get_encoder().check_model(model)
+    size = save_forest(model, output, source={"name": os.path.basename(path), "sha256": file_digest(path)})
+    print(f"Wrote {output}: {size:,} bytes (source {os.path.getsize(path):,} bytes)")
+
+    if args.check_rows:
+        encoder = get_encoder()
+        rng = np.random.default_rng(0)
+        X = np.round(rng.uniform(encoder.low, encoder.high, (args.check_rows, encoder.n_features)), 1)
+        # Some missing values too, so the NaN branches are compared as well.
+        X[rng.random(X.shape) < 0.05] = np.nan
+        exported = load_forest(output)
+        expected = model.predict_proba(encoder.model_input(model, encoder.as_matrix(X)))
+        err = np.abs(exported.predict_proba(X) - expected).max()
+        print(f"max |probability difference| on {args.check_rows:,} random rows: {err:.2e}")
+        if err > 1e-9:
+            print("export does not reproduce the source model", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
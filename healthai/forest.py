@@ -0,0 +1,141 @@
+# forest.py - flat-array evaluation of a fitted sklearn tree ensemble
+#
+# All trees are concatenated into one set of node arrays. Leaves point back
+# at themselves, so every (row, tree) pair can be advanced in lock-step for
+# max_depth steps with plain NumPy indexing - no per-call validation, no
+# DataFrame, no joblib dispatch over the estimators.
+#
+# A NaN input follows each split's missing-value branch (sklearn's
+# tree_.missing_go_to_left), so rows with missing values score exactly as
+# they do in sklearn.
+import numpy as np
+
+
+class CompiledForest:
+    """Read-only, NumPy-only copy of a fitted tree-ensemble classifier.
+
+    ``predict_proba`` matches the source model within floating-point
+    tolerance. Inputs are rounded to float32 first, as sklearn trees do.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 classes, n_features, feature_names=None, feature_importances=None, missing_left=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        # Per node: NaN goes to the left child. None for forests exported
+        # before it was recorded; those refuse rows with missing values.
+        self.missing_left = None if missing_left is None else np.asarray(missing_left, dtype=bool)
+        # left/right interleaved so one gather picks the next node.
+        self._children = np.column_stack([left, right]).ravel()
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes)
+        self.n_features = int(n_features)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        if feature_importances is not None:
+            self.feature_importances_ = np.asarray(feature_importances)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Build from a fitted forest (or a single tree) classifier."""
+        estimators = getattr(model, 'estimators_', None) or [model]
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise ValueError("only single-output classifiers can be compiled")
+
+        features, thresholds, lefts, rights, values, roots, missing = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for est in estimators:
+            tree = est.tree_
+            n = tree.node_count
+            idx = np.arange(offset, offset + n)
+            is_leaf = tree.children_left < 0
+            left = np.where(is_leaf, idx, tree.children_left + offset)
+            right = np.where(is_leaf, idx, tree.children_right + offset)
+            value = tree.value[:, 0, :].astype(np.float64)
+            value /= value.sum(axis=1, keepdims=True)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            # Trees from sklearn < 1.3 have no missing-value support: NaN goes right.
+            missing_left = getattr(tree, 'missing_go_to_left', None)
+            missing.append(np.zeros(n, dtype=bool) if missing_left is None
+                           else (np.asarray(missing_left) != 0) & ~is_leaf)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value)
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+            feature_names=getattr(model, 'feature_names_in_', None),
+            feature_importances=getattr(model, 'feature_importances_', None),
+            missing_left=np.concatenate(missing),
+        )
+
+    def _has_missing(self, flat):
+        if not np.isnan(flat).any():
+            return False
+        if self.missing_left is None:
+            raise ValueError("this forest was exported without missing-value routing; "
+                             "re-export it to score rows with NaN")
+        return True
+
+    def _go_right(self, x, node, has_missing):
+        """Right-child flags for the values ``x`` at ``node``."""
+        go_right = ~(x <= self.threshold[node])
+        if has_missing:
+            go_right &= ~(np.isnan(x) & self.missing_left[node])
+        return go_right
+
+    def apply(self, X):
+        """Leaf node index reached by every row in every tree, shape (n_rows, n_trees)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        n_rows, n_cols = X.shape
+        if n_cols != self.n_features:
+            raise ValueError(f"X has {n_cols} features, but the forest expects {self.n_features}")
+        flat = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.intp) * n_cols)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        children = self._children
+        has_missing = self._has_missing(flat)
+        for _ in range(self.max_depth):
+            go_right = self._go_right(flat[row_base + self.feature[node]], node, has_missing)
+            node = children[2 * node + go_right]
+        return node
+
+    def predict_proba(self, X):
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+
+def compile_forest(model):
+    """Convert a model returned by ``load_model`` into a ``CompiledForest``."""
+    if isinstance(model, CompiledForest):
+        return model
+    return CompiledForest.from_sklearn(model)
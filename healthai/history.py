@@ -0,0 +1,193 @@
+# history.py - bounded chat history with on-disk spill and cached HTML
+#
+# A session keeps at most ``capacity`` turns in memory, in a fixed-size ring
+# of slotted records. When the ring is full the oldest turn is appended to a
+# per-session JSONL file and only its byte offset stays in memory, so older
+# pages can be read back on demand without holding them. Each turn renders
+# its HTML once; showing the last N turns joins N cached fragments into a
+# single block, so a render costs the same at message 10 and message 10,000.
+#
+# Turns are kept small for servers with many sessions: role and urgency are
+# interned (every turn shares the same few strings), timestamps are int epoch
+# seconds, and compact() moves in-memory turns to the spill file early when
+# sessions.SessionStore needs the memory back.
+import array
+import html
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+DEFAULT_CAPACITY = 200
+
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_CSS_CLASS = {"HIGH EMERGENCY": "high-emergency", "EMERGENCY": "emergency"}
+
+
+def message_html(text):
+    """Escaped HTML for a chat message; keeps **bold** and line breaks."""
+    return _BOLD.sub(r"<strong>\1</strong>", html.escape(text)).replace("\n", "<br>")
+
+
+class ChatTurn:
+    __slots__ = ("role", "content", "urgency", "ts", "_html")
+
+    def __init__(self, role, content, urgency=None, ts=None):
+        self.role = sys.intern(role)
+        self.content = content
+        self.urgency = urgency if urgency is None else sys.intern(urgency)
+        self.ts = int(time.time() if ts is None else ts)
+        self._html = None
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by this turn alone (role and urgency are
+        shared, so not counted)."""
+        size = sys.getsizeof(self) + sys.getsizeof(self.content) + sys.getsizeof(self.ts)
+        return size if self._html is None else size + sys.getsizeof(self._html)
+
+    @property
+    def html(self):
+        if self._html is None:
+            if self.role == "user":
+                css = "user-message"
+            else:
+                css = _CSS_CLASS.get(self.urgency, "bot-message")
+            self._html = f"<div class='{css}'>{message_html(self.content)}</div>"
+        return self._html
+
+    def to_dict(self):
+        return {"role": self.role, "content": self.content, "urgency": self.urgency, "ts": self.ts}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["role"], d["content"], d.get("urgency"), d.get("ts"))
+
+
+class ChatHistory:
+    """Per-session chat log: the newest ``capacity`` turns in memory, older
+    ones spilled to ``<spill_dir>/<session_id>.jsonl``.
+
+    Indexing counts from the first turn of the session, spilled or not.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, spill_dir=None, session_id=None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.spill_dir = spill_dir or os.path.join(tempfile.gettempdir(), "healthai_chat")
+        self.session_id = session_id or uuid.uuid4().hex
+        self._ring = [None] * capacity
+        self._start = 0          # ring index of the oldest in-memory turn
+        self._count = 0          # turns in memory
+        self._offsets = array.array('Q')   # byte offset of every spilled turn
+        self._lock = threading.Lock()
+
+    @property
+    def spill_path(self):
+        return os.path.join(self.spill_dir, f"{self.session_id}.jsonl")
+
+    @property
+    def spilled(self):
+        return len(self._offsets)
+
+    @property
+    def in_memory(self):
+        return self._count
+
+    def __len__(self):
+        return self.spilled + self._count
+
+    def append(self, role, content, urgency=None, ts=None):
+        turn = ChatTurn(role, content, urgency, ts)
+        with self._lock:
+            if self._count == self.capacity:
+                self._spill(self._ring[self._start])
+                self._ring[self._start] = turn
+                self._start = (self._start + 1) % self.capacity
+            else:
+                self._ring[(self._start + self._count) % self.capacity] = turn
+                self._count += 1
+        return turn
+
+    def _spill(self, *turns):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        with open(self.spill_path, 'ab') as f:
+            for turn in turns:
+                self._offsets.append(f.tell())
+                f.write(json.dumps(turn.to_dict()).encode('utf-8') + b"\n")
+
+    def _read_spilled(self, start, stop):
+        if start >= stop:
+            return []
+        with open(self.spill_path, 'rb') as f:
+            f.seek(self._offsets[start])
+            return [ChatTurn.from_dict(json.loads(f.readline())) for _ in range(stop - start)]
+
+    def turns(self, start=0, stop=None):
+        """Turns ``start:stop`` in order; spilled ones are read from disk."""
+        with self._lock:
+            total = self.spilled + self._count
+            stop = total if stop is None else min(stop, total)
+            start = max(0, start)
+            spilled = self.spilled
+            out = self._read_spilled(start, min(stop, spilled))
+            for i in range(max(start, spilled), stop):
+                out.append(self._ring[(self._start + i - spilled) % self.capacity])
+            return out
+
+    def tail(self, n):
+        return self.turns(len(self) - n)
+
+    def render_html(self, n):
+        """The last ``n`` turns as one HTML block."""
+        return "".join(turn.html for turn in self.tail(n))
+
+    def memory_bytes(self):
+        """Approximate bytes held in memory: the in-memory turns (with any
+        cached HTML), the ring and the spill offsets."""
+        with self._lock:
+            turns = sum(self._ring[(self._start + i) % self.capacity].nbytes for i in range(self._count))
+            return turns + sys.getsizeof(self._ring) + sys.getsizeof(self._offsets)
+
+    def compact(self, keep=0):
+        """Spill all but the newest ``keep`` in-memory turns to disk.
+        Returns the number of turns spilled."""
+        with self._lock:
+            n = self._count - max(0, keep)
+            if n <= 0:
+                return 0
+            idx = [(self._start + i) % self.capacity for i in range(n)]
+            self._spill(*(self._ring[i] for i in idx))
+            for i in idx:
+                self._ring[i] = None
+            self._start = (self._start + n) % self.capacity
+            self._count -= n
+            return n
+
+    def drop_html(self, keep=0):
+        """Forget the cached HTML of all but the newest ``keep`` in-memory
+        turns; it is rebuilt if those turns are shown again."""
+        with self._lock:
+            for i in range(max(0, self._count - max(0, keep))):
+                self._ring[(self._start + i) % self.capacity]._html = None
+
+    def clear(self):
+        with self._lock:
+            self._ring = [None] * self.capacity
+            self._start = self._count = 0
+            self._offsets = array.array('Q')
+            try:
+                os.remove(self.spill_path)
+            except FileNotFoundError:
+                pass
+
+    def __del__(self):
+        try:
+            os.remove(self.spill_path)
+        except (OSError, AttributeError, TypeError):
+            pass
@@ -0,0 +1,63 @@
+# intents.py - single-pass intent routing for chat messages
+#
+# generate_response needs to know whether a message greets, names a drug,
+# sounds like an emergency, lists symptoms or asks for advice. All of those
+# vocabularies go into one TokenMatcher, each phrase tagged with the intents
+# it signals, so a message is tokenized and scanned once and the handlers
+# reuse what the scan found. Matching is whole-word: "hi" no longer fires
+# inside "this", nor "tip" inside "multiple".
+from .text import TokenMatcher, tokenize
+
+GREETING, DRUG, EMERGENCY, SYMPTOM, ADVICE = 1, 2, 4, 8, 16
+
+GREETINGS = ("hello", "hi", "hey", "good morning", "good evening")
+EMERGENCY_PHRASES = ("911", "emergency", "emergencies", "ambulance", "help me", "urgent", "urgently",
+                     "dying", "heart attack")
+ADVICE_WORDS = ("advice", "advise", "tip", "tips", "healthy", "healthier", "prevent", "prevention",
+                "preventing")
+
+
+class Intents:
+    """What one message mentions. ``drug`` is the canonical name of the first
+    drug named; ``symptoms`` are in vocabulary order, like ``extract_symptoms``."""
+    __slots__ = ("text", "greeting", "drug", "emergency", "symptoms", "advice")
+
+    def __init__(self, text):
+        self.text = text
+        self.greeting = False
+        self.drug = None
+        self.emergency = False
+        self.symptoms = []
+        self.advice = False
+
+
+class IntentRouter:
+    def __init__(self, symptoms, drug_index, greetings=GREETINGS, emergency=EMERGENCY_PHRASES,
+                 advice=ADVICE_WORDS):
+        self.drug_index = drug_index
+        self._symptom_rank = {s: i for i, s in enumerate(dict.fromkeys(symptoms))}
+        self._tags = {}
+        for flag, phrases in ((GREETING, greetings), (EMERGENCY, emergency), (ADVICE, advice),
+                              (SYMPTOM, self._symptom_rank), (DRUG, drug_index.keys())):
+            for phrase in phrases:
+                self._tags[phrase] = self._tags.get(phrase, 0) | flag
+        self._matcher = TokenMatcher(self._tags)
+
+    def route(self, text):
+        """``Intents`` of ``text`` from one pass of the combined matcher."""
+        intents = Intents(text)
+        tags = self._tags
+        found = 0
+        symptoms = set()
+        for _, phrase in self._matcher.finditer(tokenize(text.lower())):
+            flags = tags[phrase]
+            found |= flags
+            if flags & DRUG and intents.drug is None:
+                intents.drug = self.drug_index.exact(phrase)
+            if flags & SYMPTOM:
+                symptoms.add(phrase)
+        intents.greeting = bool(found & GREETING)
+        intents.emergency = bool(found & EMERGENCY)
+        intents.advice = bool(found & ADVICE)
+        intents.symptoms = sorted(symptoms, key=self._symptom_rank.__getitem__)
+        return intents
@@ -0,0 +1,239 @@
+# kb.py - on-disk knowledge base for the chatbot (symptoms, conditions, drugs)
+#
+# The knowledge base is a read-only SQLite file opened with a memory-mapped
+# page cache, so any number of worker processes share the same physical
+# pages and nothing is parsed up front. The chatbot sees each table through a
+# read-only Mapping that fetches a record on first access and keeps it.
+#
+# Build one from the built-in data (plus optional extras) with:
+#   python -m healthai.kb build healthai_kb.db [--json extra.json] [--formulary drugs.csv]
+# and point the app at it with HEALTHAI_KB=healthai_kb.db.
+import argparse
+import collections.abc
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from .drugs import DRUG_FIELDS, load_formulary, normalize
+
+SCHEMA_VERSION = 1
+DEFAULT_MMAP_SIZE = 256 << 20
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE TABLE symptoms (name TEXT PRIMARY KEY, rank INTEGER NOT NULL, emergency INTEGER NOT NULL DEFAULT 0,
+                       explanation TEXT, follow_up TEXT) WITHOUT ROWID;
+CREATE TABLE conditions (key TEXT PRIMARY KEY, conditions TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE drugs (name TEXT PRIMARY KEY, rank INTEGER NOT NULL, uses TEXT, dosage TEXT,
+                    side_effects TEXT, precautions TEXT) WITHOUT ROWID;
+CREATE TABLE drug_aliases (alias TEXT PRIMARY KEY, name TEXT NOT NULL) WITHOUT ROWID;
+CREATE INDEX symptoms_rank ON symptoms (rank);
+CREATE INDEX drugs_rank ON drugs (rank);
+"""
+
+
+class KnowledgeBase:
+    """Read-only handle on a knowledge-base file.
+
+    The attributes mirror HealthcareChatbot's: ``symptom_explanations``,
+    ``follow_up_questions``, ``emergency_symptoms``, ``symptom_conditions``,
+    ``drug_database`` and ``drug_aliases`` are lazy Mappings; ``symptom_names()``
+    returns the whole vocabulary (longest first) for the phrase matcher.
+    """
+
+    def __init__(self, path, mmap_size=DEFAULT_MMAP_SIZE):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"knowledge base not found: {path}")
+        self.path = path
+        self.mmap_size = mmap_size
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        version = self._query("SELECT value FROM meta WHERE key = 'version'")
+        if not version or int(version[0][0]) != SCHEMA_VERSION:
+            raise ValueError(f"{path}: unsupported knowledge base version")
+
+        self.symptom_explanations = KBMapping(
+            self, "SELECT explanation FROM symptoms WHERE name = ? AND explanation IS NOT NULL",
+            "SELECT name FROM symptoms WHERE explanation IS NOT NULL ORDER BY name")
+        self.follow_up_questions = KBMapping(
+            self, "SELECT follow_up FROM symptoms WHERE name = ? AND follow_up IS NOT NULL",
+            "SELECT name FROM symptoms WHERE follow_up IS NOT NULL ORDER BY name", json.loads)
+        self.emergency_symptoms = KBMapping(
+            self, "SELECT emergency FROM symptoms WHERE name = ? AND emergency",
+            "SELECT name FROM symptoms WHERE emergency ORDER BY name", bool)
+        self.symptom_conditions = KBMapping(
+            self, "SELECT conditions FROM conditions WHERE key = ?",
+            "SELECT key FROM conditions ORDER BY key", json.loads)
+        self.drug_database = KBMapping(
+            self, f"SELECT {', '.join(DRUG_FIELDS)} FROM drugs WHERE name = ?",
+            "SELECT name FROM drugs ORDER BY rank", lambda *row: dict(zip(DRUG_FIELDS, row)))
+        self.drug_aliases = KBMapping(
+            self, "SELECT name FROM drug_aliases WHERE alias = ?",
+            "SELECT alias FROM drug_aliases ORDER BY alias")
+
+    def _connect(self):
+        # immutable=1: no locking or change detection, the file is never written
+        # while open. A forked child gets its own connection.
+        uri = f"file:{os.path.abspath(self.path)}?mode=ro&immutable=1"
+        db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        db.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        self._db, self._pid = db, os.getpid()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._connect()
+            return self._db.execute(sql, params).fetchall()
+
+    def symptom_names(self):
+        """Every symptom in vocabulary order (longest first), as the matcher expects."""
+        return [name for (name,) in self._query("SELECT name FROM symptoms ORDER BY rank")]
+
+    def stats(self):
+        counts = {table: self._query(f"SELECT COUNT(*) FROM {table}")[0][0]
+                  for table in ("symptoms", "conditions", "drugs", "drug_aliases")}
+        counts["file_size"] = os.path.getsize(self.path)
+        return counts
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self._pid = None
+
+
+class KBMapping(collections.abc.Mapping):
+    """Read-only view of one knowledge-base column; records are decoded on
+    first access and memoized (misses are not, so unknown keys cost nothing)."""
+
+    def __init__(self, kb, get_sql, keys_sql, decode=None):
+        self._kb = kb
+        self._get_sql = get_sql
+        self._keys_sql = keys_sql
+        self._decode = decode
+        self._loaded = {}
+        self._len = None
+
+    def __getitem__(self, key):
+        try:
+            return self._loaded[key]
+        except KeyError:
+            pass
+        if not isinstance(key, str):
+            raise KeyError(key)
+        rows = self._kb._query(self._get_sql, (key,))
+        if not rows:
+            raise KeyError(key)
+        row = rows[0]
+        value = row[0] if self._decode is None else self._decode(*row)
+        self._loaded[key] = value
+        return value
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return (key for (key,) in self._kb._query(self._keys_sql))
+
+    def __len__(self):
+        if self._len is None:
+            self._len = self._kb._query(f"SELECT COUNT(*) FROM ({self._keys_sql})")[0][0]
+        return self._len
+
+
+# -------------------------
+# Building
+# -------------------------
+def build_kb(path, source, extra=None):
+    """Write a knowledge base from ``source`` (anything with HealthcareChatbot's
+    data attributes) merged with ``extra``, a dict of the same attribute names.
+    Returns the table counts."""
+    data = {name: getattr(source, name) for name in (
+        "symptom_list", "emergency_symptoms", "symptom_explanations", "follow_up_questions",
+        "symptom_conditions", "drug_database", "drug_aliases")}
+    data = {name: (list(value) if name in ("symptom_list", "emergency_symptoms") else dict(value))
+            for name, value in data.items()}
+    for name, value in (extra or {}).items():
+        if name not in data:
+            raise ValueError(f"unknown knowledge base section {name!r}")
+        if isinstance(data[name], list):
+            data[name].extend(value)
+        else:
+            data[name].update(value)
+
+    symptoms = dict.fromkeys(s.lower() for s in data["symptom_list"])
+    for section in ("emergency_symptoms", "symptom_explanations", "follow_up_questions"):
+        symptoms.update(dict.fromkeys(data[section]))
+    symptoms = sorted(symptoms, key=lambda s: -len(s))
+    emergency = set(data["emergency_symptoms"])
+
+    tmp = f"{path}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    db = sqlite3.connect(tmp)
+    try:
+        db.executescript(SCHEMA)
+        db.execute("INSERT INTO meta VALUES ('version', ?)", (str(SCHEMA_VERSION),))
+        db.executemany("INSERT INTO symptoms VALUES (?, ?, ?, ?, ?)", (
+            (name, rank, int(name in emergency), data["symptom_explanations"].get(name),
+             json.dumps(data["follow_up_questions"][name]) if name in data["follow_up_questions"] else None)
+            for rank, name in enumerate(symptoms)))
+        db.executemany("INSERT INTO conditions VALUES (?, ?)",
+                       ((key, json.dumps(list(value))) for key, value in data["symptom_conditions"].items()))
+        db.executemany(f"INSERT INTO drugs VALUES (?, ?, {', '.join('?' * len(DRUG_FIELDS))})", (
+            (normalize(name), rank, *(info.get(field, "") for field in DRUG_FIELDS))
+            for rank, (name, info) in enumerate(data["drug_database"].items())))
+        db.executemany("INSERT INTO drug_aliases VALUES (?, ?)",
+                       ((normalize(alias), normalize(name)) for alias, name in data["drug_aliases"].items()))
+        db.commit()
+        db.execute("VACUUM")
+    finally:
+        db.close()
+    os.replace(tmp, path)
+    return KnowledgeBase(path).stats()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m healthai.kb", description="Build or inspect a knowledge base file.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="write the built-in data (plus extras) to a knowledge base file")
+    build.add_argument("output")
+    build.add_argument("--json", action="append", default=[],
+                       help="JSON object keyed like HealthcareChatbot's attributes (drug_database, ...)")
+    build.add_argument("--formulary", action="append", default=[], help="drug CSV (see healthai.drugs.load_formulary)")
+    info = sub.add_parser("info", help="print table sizes")
+    info.add_argument("path")
+    args = ap.parse_args(argv)
+
+    if args.command == "info":
+        print(json.dumps(KnowledgeBase(args.path).stats(), indent=2))
+        return 0
+
+    from .chatbot import HealthcareChatbot
+    extra = collections.defaultdict(dict)
+    for path in args.json:
+        with open(path, encoding="utf-8") as f:
+            for name, value in json.load(f).items():
+                if isinstance(value, list):
+                    extra[name] = list(extra.get(name) or []) + value
+                else:
+                    extra[name].update(value)
+    for path in args.formulary:
+        database, aliases = load_formulary(path)
+        extra["drug_database"].update(database)
+        extra["drug_aliases"].update(aliases)
+    stats = build_kb(args.output, HealthcareChatbot(), extra)
+    print(f"wrote {args.output}: " + ", ".join(f"{k}={v:,}" for k, v in stats.items()), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+# metrics.py - latency histograms and counters for the hot paths
+#
+# Instrumented functions are wrapped with ``@timed("op")`` (or a
+# ``with timer("op"):`` block). While metrics are off - the default - the
+# wrapper costs one flag check; turn them on with HEALTHAI_METRICS=1 or
+# ``enable()``. Objects with their own counters (prediction cache, model
+# registry, micro-batcher) register a collector and are read at export time.
+#
+# ``render_prometheus()`` gives the Prometheus text format; the HTTP service
+# serves it at GET /metrics and ``start_http_server(port)`` exposes it from
+# any other process (the Streamlit app does so when HEALTHAI_METRICS_PORT is
+# set).
+import bisect
+import functools
+import os
+import threading
+import time
+
+# Upper bounds in seconds, 1us .. 10s.
+DEFAULT_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_enabled = os.environ.get("HEALTHAI_METRICS", "").lower() in ("1", "true", "yes", "on")
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def enabled():
+    return _enabled
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "errors")
+
+    def __init__(self, n_buckets):
+        self.counts = [0] * (n_buckets + 1)   # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._collectors = {}
+
+    def observe(self, op, seconds, error=False):
+        with self._lock:
+            h = self._histograms.get(op)
+            if h is None:
+                h = self._histograms[op] = Histogram(len(self.buckets))
+            h.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            h.count += 1
+            h.sum += seconds
+            h.errors += error
+
+    def register_collector(self, name, fn):
+        """``fn()`` returns a dict; its numeric values are exported as gauges.
+        A value that is itself a dict of numbers (a histogram, a set of
+        percentiles) becomes one gauge with a ``key`` label per entry; any
+        other value is ignored."""
+        with self._lock:
+            self._collectors[name] = fn
+
+    def quantile(self, op, q):
+        """Estimate of the ``q`` quantile from the buckets (linear within a bucket)."""
+        with self._lock:
+            h = self._histograms.get(op)
+            if h is None or not h.count:
+                return None
+            counts = list(h.counts)
+            total = h.count
+        rank = q * total
+        seen, lower = 0, 0.0
+        for upper, n in zip(self.buckets + (self.buckets[-1],), counts):
+            if seen + n >= rank and n:
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.buckets[-1]
+
+    def snapshot(self):
+        """``{"ops": {op: {count, sum, mean, errors, p50, p95, p99}}, "gauges": {...}}``."""
+        with self._lock:
+            ops = {op: (h.count, h.sum, h.errors) for op, h in self._histograms.items()}
+        out = {}
+        for op, (count, total, errors) in sorted(ops.items()):
+            out[op] = {"count": count, "sum": total, "mean": total / count if count else 0.0,
+                       "errors": errors, "p50": self.quantile(op, 0.5),
+                       "p95": self.quantile(op, 0.95), "p99": self.quantile(op, 0.99)}
+        return {"ops": out, "gauges": self.collect()}
+
+    def collect(self):
+        with self._lock:
+            collectors = dict(self._collectors)
+        gauges = {}
+        for name, fn in sorted(collectors.items()):
+            try:
+                values = fn()
+            except Exception:
+                continue
+            gauges[name] = {}
+            for k, v in values.items():
+                if isinstance(v, dict):
+                    v = {str(sub): n for sub, n in v.items() if _is_number(n)}
+                    if v:
+                        gauges[name][k] = v
+                elif _is_number(v):
+                    gauges[name][k] = v
+        return gauges
+
+    def render_prometheus(self):
+        lines = ["# HELP healthai_call_seconds Latency of instrumented HealthAI calls.",
+                 "# TYPE healthai_call_seconds histogram"]
+        with self._lock:
+            hists = {op: (list(h.counts), h.count, h.sum, h.errors) for op, h in self._histograms.items()}
+        errors = []
+        for op, (counts, count, total, errs) in sorted(hists.items()):
+            label = _escape(op)
+            cumulative = 0
+            for upper, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'healthai_call_seconds_bucket{{op="{label}",le="{upper:g}"}} {cumulative}')
+            lines.append(f'healthai_call_seconds_bucket{{op="{label}",le="+Inf"}} {count}')
+            lines.append(f'healthai_call_seconds_sum{{op="{label}"}} {total!r}')
+            lines.append(f'healthai_call_seconds_count{{op="{label}"}} {count}')
+            errors.append(f'healthai_call_errors_total{{op="{label}"}} {errs}')
+        if errors:
+            lines += ["# HELP healthai_call_errors_total Instrumented calls that raised.",
+                      "# TYPE healthai_call_errors_total counter"] + errors
+        for name, values in self.collect().items():
+            for key, value in sorted(values.items()):
+                metric = f"healthai_{name}_{key}"
+                lines.append(f"# TYPE {metric} gauge")
+                if isinstance(value, dict):
+                    lines += [f'{metric}{{key="{_escape(sub)}"}} {n!r}' for sub, n in value.items()]
+                else:
+                    lines.append(f"{metric} {value!r}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics():
+    """The process-wide ``MetricsRegistry``."""
+    return _metrics
+
+
+def timed(op):
+    """Decorator recording each call's latency under ``op`` while metrics are on."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                _metrics.observe(op, time.perf_counter() - t0, error=not ok)
+        return wrapper
+    return decorate
+
+
+class timer:
+    """``with timer("op"):`` - context-manager form of ``timed``."""
+    __slots__ = ("op", "_t0")
+
+    def __init__(self, op):
+        self.op = op
+        self._t0 = None
+
+    def __enter__(self):
+        if _enabled:
+            self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._t0 is not None:
+            _metrics.observe(self.op, time.perf_counter() - self._t0, error=exc_type is not None)
+            self._t0 = None
+        return False
+
+
+def register_collector(name, fn):
+    _metrics.register_collector(name, fn)
+
+
+_http_server = None
+_http_lock = threading.Lock()
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serve ``render_prometheus()`` at http://host:port/metrics from a daemon
+    thread. Idempotent; returns the server."""
+    global _http_server
+    with _http_lock:
+        if _http_server is not None:
+            return _http_server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = _metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="healthai-metrics", daemon=True).start()
+        _http_server = server
+        return server
@@ -0,0 +1,150 @@
+# model.py - heart-disease model loading, feature encoding and risk scoring
+#
+# joblib (via read_model) and NumPy (via the feature encoder) are imported
+# inside the functions that need them so that importing this module
+# stays cheap for workers that never touch the model.
+import os
+
+from .metrics import timed
+
+# In order of preference: .hforest files are pickle-free exports
+# (healthai.export), so an exported copy next to the original is picked up
+# before it.
+MODEL_EXTENSIONS = ('.hforest', '.joblib', '.pkl', '.pblib', '.model')
+
+# UI labels for the categorical inputs; the model expects the list index.
+SEX_OPTIONS = ["Female", "Male"]
+YES_NO_OPTIONS = ["No", "Yes"]
+CP_OPTIONS = ["Typical angina", "Atypical angina", "Non-anginal pain", "Asymptomatic"]
+RESTECG_OPTIONS = ["Normal", "ST-T wave abnormality", "Left ventricular hypertrophy"]
+SLOPE_OPTIONS = ["Upsloping", "Flat", "Downsloping"]
+THAL_OPTIONS = ["Normal", "Fixed defect", "Reversible defect"]
+
+# The model's inputs in column order: (name, UI labels or None, lowest and
+# highest accepted value). Code ranges follow the UCI heart-disease coding,
+# which is wider than the form for ca (0-4) and thal (0-3).
+# HeartFeatureEncoder (healthai.encoder) is built from this table.
+FEATURE_SCHEMA = (
+    ('age', None, 0, 120),
+    ('sex', SEX_OPTIONS, 0, 1),
+    ('cp', CP_OPTIONS, 0, 3),
+    ('trestbps', None, 0, 300),
+    ('chol', None, 0, 1000),
+    ('fbs', YES_NO_OPTIONS, 0, 1),
+    ('restecg', RESTECG_OPTIONS, 0, 2),
+    ('thalach', None, 0, 300),
+    ('exang', YES_NO_OPTIONS, 0, 1),
+    ('oldpeak', None, -10, 10),
+    ('slope', SLOPE_OPTIONS, 0, 2),
+    ('ca', None, 0, 4),
+    ('thal', THAL_OPTIONS, 0, 3),
+)
+
+FEATURE_NAMES = [name for name, _, _, _ in FEATURE_SCHEMA]
+
+
+@timed("load_model")
+def load_model(model_path=None, search_dir='.'):
+    """
+    Loads a model from a given path.
+    If no path is provided, attempts auto-detection in ``search_dir``.
+    Returns ``(model, name)``; on failure ``(None, "error:...")`` or ``(None, None)``.
+
+    Models come from the shared registry, so repeated calls for the same
+    file return the same object until the file's contents change.
+    """
+    from .registry import get_registry
+
+    if not (model_path and model_path.strip()):
+        model_path = find_model_file(search_dir)
+        if model_path is None:
+            return None, None
+    try:
+        entry = get_registry().get(model_path)
+        return entry.model, entry.name
+    except Exception as e:
+        return None, f"error:{e}"
+
+
+def read_model(path, mmap_mode='r'):
+    """Load one model file: ``.hforest`` exports as a ``CompiledForest``
+    (no pickle, no scikit-learn), anything else with joblib."""
+    if path.lower().endswith('.hforest'):
+        from .export import load_forest
+
+        return load_forest(path, mmap_mode=mmap_mode is not None)
+    import joblib
+
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+def find_model_file(search_dir='.'):
+    """Path of the first model file in ``search_dir`` - by position of its
+    extension in ``MODEL_EXTENSIONS``, then by name - or None."""
+    model_files = sorted((f for f in os.listdir(search_dir) if f.endswith(MODEL_EXTENSIONS)),
+                         key=lambda f: (next(i for i, ext in enumerate(MODEL_EXTENSIONS) if f.endswith(ext)), f))
+    if not model_files:
+        return None
+    return os.path.join(search_dir, model_files[0])
+
+
+@timed("encode_features")
+def encode_features(age, sex, cp, trestbps, chol, fbs, restecg,
+                    thalach, exang, oldpeak, slope, ca, thal):
+    """Turn the predictor's form values (UI labels or codes) into the model's
+    feature row, a float64 array. Raises ``ValueError`` for unknown labels
+    and out-of-range values."""
+    from .encoder import get_encoder
+
+    return get_encoder().encode_values(age, sex, cp, trestbps, chol, fbs, restecg,
+                                       thalach, exang, oldpeak, slope, ca, thal)
+
+
+@timed("predict_risk")
+def predict_risk(model, features, cache=None, model_key=None, batcher=None):
+    """Score one encoded feature row.
+
+    Returns ``{"prediction": 0|1, "probabilities": [p_no_disease, p_disease]}``.
+    With a ``PredictionCache`` and a ``model_key`` (the registry digest),
+    repeated rows are answered from the cache. With a ``MicroBatcher`` the
+    row is scored together with whatever other rows arrive in its window.
+    """
+    use_cache = cache is not None and model_key is not None
+    if use_cache:
+        cached = cache.get(model_key, features)
+        if cached is not None:
+            return cached
+
+    if batcher is not None:
+        result = batcher.predict(model, features)
+        if use_cache:
+            cache.put(model_key, features, result)
+        return result
+
+    from .encoder import get_encoder
+
+    # The model's columns are checked against the schema once per model,
+    # after which the row is only wrapped in the column names it was fitted on.
+    encoder = get_encoder()
+    encoder.check_model(model)
+    X = encoder.as_matrix(features)
+    # One forest traversal: the label is the argmax of the probabilities,
+    # which is how sklearn's predict derives it as well.
+    prediction_proba = model.predict_proba(encoder.model_input(model, X))[0]
+    prediction = model.classes_[prediction_proba.argmax()]
+    result = {
+        "prediction": int(prediction),
+        "probabilities": [float(p) for p in prediction_proba]
+    }
+    if use_cache:
+        cache.put(model_key, features, result)
+    return result
+
+
+@timed("top_feature_importances")
+def top_feature_importances(model, n=5):
+    """Return ``[(feature, importance), ...]`` for the model's top ``n`` features."""
+    if not hasattr(model, 'feature_importances_'):
+        return []
+    pairs = zip(FEATURE_NAMES, model.feature_importances_)
+    return sorted(pairs, key=lambda p: p[1], reverse=True)[:n]
@@ -0,0 +1,135 @@
+# parallel.py - multi-process scoring for large heart-disease batches
+#
+# Usage:
+#   python -m healthai.batch registry.parquet -o scored.parquet --workers 8
+#
+# Workers never receive the model over a pipe. With the "fork" start method
+# (the default on Linux) the model is loaded once in the parent and the
+# children share its pages copy-on-write; each worker looks its scorer's
+# model up by the token passed to its initializer, so pools of different
+# scorers never mix models up. With "spawn"/"forkserver" each worker opens
+# the same file with joblib's mmap_mode (or maps the .hforest export) so the
+# numpy buffers come from the page cache instead of private copies.
+import collections
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import DEFAULT_CHUNKSIZE, _ChunkWriter, encode_frame, iter_chunks, positive_class_index, score_array
+from .encoder import get_encoder
+from .model import find_model_file, read_model
+
+# Models of live fork-mode scorers by token, inherited by their workers.
+_fork_models = {}
+_tokens = itertools.count()
+_worker_model = None
+
+
+def _init_worker(model_path, token):
+    global _worker_model
+    _worker_model = _fork_models.get(token)
+    if _worker_model is None:
+        _worker_model = read_model(model_path)
+    get_encoder().check_model(_worker_model)
+    # One process per core already; keep sklearn from adding its own threads.
+    if hasattr(_worker_model, 'n_jobs'):
+        _worker_model.n_jobs = 1
+
+
+def _score_chunk(X):
+    return score_array(_worker_model, X)
+
+
+class ParallelScorer:
+    """Spread batch scoring over a pool of worker processes.
+
+    ``workers`` defaults to ``os.cpu_count()``; ``chunksize`` is the number
+    of rows sent to a worker per task. Use as a context manager, or call
+    ``close()`` when done.
+    """
+
+    def __init__(self, model_path=None, workers=None, chunksize=DEFAULT_CHUNKSIZE, start_method=None):
+        self.model_path = model_path or find_model_file()
+        if self.model_path is None:
+            raise FileNotFoundError("no model file found")
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.start_method = start_method or multiprocessing.get_start_method()
+
+        self.model = read_model(self.model_path)
+        get_encoder().check_model(self.model)
+        self.positive_column = positive_class_index(self.model)
+        # Workers are forked lazily, on the first submits, so the model must
+        # stay reachable until close().
+        self._token = next(_tokens)
+        if self.start_method == 'fork':
+            _fork_models[self._token] = self.model
+        self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                         mp_context=multiprocessing.get_context(self.start_method),
+                                         initializer=_init_worker, initargs=(self.model_path, self._token))
+
+    def _submit(self, X):
+        return [self._pool.submit(_score_chunk, X[i:i + self.chunksize])
+                for i in range(0, len(X), self.chunksize)]
+
+    @staticmethod
+    def _gather(futures):
+        parts = [f.result() for f in futures]
+        if not parts:
+            return np.empty(0), np.empty((0, 2))
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def score_array(self, X):
+        """Score an encoded (n, 13) matrix; returns ``(labels, probabilities)`` in input order."""
+        return self._gather(self._submit(np.asarray(X, dtype=np.float64)))
+
+    def score_file(self, input_path, output_path=None, progress=None):
+        """Parallel counterpart of ``healthai.batch.score_file`` with the same stats.
+
+        Up to ``2 * workers`` chunks are in flight at once; results are still
+        written in input order.
+        """
+        writer = _ChunkWriter(output_path)
+        stats = {"rows": 0, "chunks": 0, "positives": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+        pending = collections.deque()
+        start = time.perf_counter()
+
+        def drain_one():
+            df, futures = pending.popleft()
+            labels, proba = self._gather(futures)
+            out = df.copy()
+            out['prediction'] = labels
+            out['probability'] = proba[:, self.positive_column]
+            writer.write(out)
+            stats["rows"] += len(out)
+            stats["chunks"] += 1
+            stats["positives"] += int((labels == 1).sum())
+            stats["seconds"] = time.perf_counter() - start
+            stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+            if progress:
+                progress(stats)
+
+        try:
+            for df in iter_chunks(input_path, self.chunksize):
+                pending.append((df, self._submit(encode_frame(df))))
+                if len(pending) >= 2 * self.workers:
+                    drain_one()
+            while pending:
+                drain_one()
+        finally:
+            writer.close()
+        return stats
+
+    def close(self):
+        self._pool.shutdown()
+        _fork_models.pop(self._token, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,225 @@
+# profiling.py - opt-in sampling profiler, one collapsed-stack file per request
+#
+# While a request is profiled, one shared daemon thread looks at the request
+# thread's current Python stack every few milliseconds and counts identical
+# stacks. The result is written in the collapsed ("folded") format that
+# flamegraph.pl, speedscope and inferno read:
+#
+#   healthai.server:_handle_request;healthai.chatbot:generate_response 42
+#
+# Starting a profile only registers the thread and nothing runs between
+# samples, so at the default 5 ms interval it is cheap enough to leave on for
+# a share of traffic:
+#
+#   HEALTHAI_PROFILE=0.05             profile 5% of requests (1 = all)
+#   HEALTHAI_PROFILE_DIR=/var/tmp/p   where .folded files go
+#   HEALTHAI_PROFILE_MIN_MS=100       keep only requests slower than this
+#   HEALTHAI_PROFILE_INTERVAL_MS=5    sampling interval
+#
+# A request can also ask for it explicitly (?profile=1 on the Streamlit page
+# or the HTTP service).
+import collections
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+
+DEFAULT_INTERVAL = 0.005
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def sample_rate():
+    return _env_float("HEALTHAI_PROFILE", 0.0)
+
+
+def profile_dir():
+    return os.environ.get("HEALTHAI_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "healthai_profiles")
+
+
+def is_forced(value):
+    """Whether a ``?profile=`` query value asks for profiling."""
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+def should_profile(forced=False):
+    """True when this request is forced or falls in the sampled fraction."""
+    if forced:
+        return True
+    rate = sample_rate()
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def _frame_label(frame):
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+class StackSampler:
+    """One daemon thread that samples the stacks of every registered thread.
+
+    Each profiled request registers its thread with a ``Counter`` that the
+    sampler fills with folded stacks; the thread only wakes while at least
+    one request is registered. Requests that overlap on one thread (asyncio
+    handlers on an event loop) each get their own entry, and each sees every
+    sample of that thread while it is registered.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self._targets = {}     # thread id -> list of [Counter, samples], one per request
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def register(self, thread_id):
+        entry = [collections.Counter(), 0]
+        with self._lock:
+            self._targets.setdefault(thread_id, []).append(entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="healthai-profiler", daemon=True)
+                self._thread.start()
+        if not self._wake.is_set():
+            self._wake.set()
+        return entry
+
+    def unregister(self, thread_id, entry):
+        """Stop filling ``entry`` (as returned by ``register``); other
+        requests on the same thread keep sampling."""
+        with self._lock:
+            entries = self._targets.get(thread_id, [])
+            for i, registered in enumerate(entries):
+                if registered is entry:
+                    del entries[i]
+                    break
+            if not entries:
+                self._targets.pop(thread_id, None)
+            return entry
+
+    def _sample(self):
+        with self._lock:
+            if not self._targets:
+                self._wake.clear()
+                return
+            frames = sys._current_frames()
+            for thread_id, entries in self._targets.items():
+                frame = frames.get(thread_id)
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                if labels:
+                    labels.reverse()
+                    stack = ";".join(labels)
+                    for entry in entries:
+                        entry[0][stack] += 1
+                        entry[1] += 1
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            self._sample()
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """The process-wide ``StackSampler`` (interval from HEALTHAI_PROFILE_INTERVAL_MS)."""
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = StackSampler(_env_float("HEALTHAI_PROFILE_INTERVAL_MS", DEFAULT_INTERVAL * 1e3) / 1e3)
+    return _sampler
+
+
+def folded(stacks):
+    """Collapsed-stack text for a ``Counter`` of folded stacks, heaviest first."""
+    return "".join(f"{stack} {n}\n" for stack, n in stacks.most_common())
+
+
+class RequestProfile:
+    """Profile of one request. ``tag`` may be changed until ``finish()``, which
+    stops sampling and writes ``<dir>/<time>-<tag>-<pid>-<n>.folded``; it
+    returns the path, or None when the request was faster than
+    HEALTHAI_PROFILE_MIN_MS or had no samples."""
+
+    _counter = 0
+    _counter_lock = threading.Lock()
+
+    def __init__(self, tag, thread_id=None, sampler=None):
+        self.tag = tag
+        self.thread_id = thread_id or threading.get_ident()
+        self.sampler = sampler or get_sampler()
+        self.started = time.perf_counter()
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.path = None
+        self._entry = self.sampler.register(self.thread_id)
+        self._finished = False
+
+    def finish(self):
+        if self._finished:
+            return self.path
+        self._finished = True
+        self.sampler.unregister(self.thread_id, self._entry)
+        self.stacks, self.samples = self._entry
+        elapsed_ms = (time.perf_counter() - self.started) * 1e3
+        if not self.samples or elapsed_ms < _env_float("HEALTHAI_PROFILE_MIN_MS", 0.0):
+            return None
+        with RequestProfile._counter_lock:
+            RequestProfile._counter += 1
+            n = RequestProfile._counter
+        tag = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.tag).strip("_") or "request"
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{tag}-{os.getpid()}-{n}.folded"
+        self.path = os.path.join(directory, name)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(f"# tag={tag} elapsed_ms={elapsed_ms:.1f} samples={self.samples} "
+                    f"interval_ms={self.sampler.interval * 1e3:g}\n")
+            f.write(folded(self.stacks))
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.finish()
+        return False
+
+
+def start_request(tag, forced=False):
+    """A running ``RequestProfile`` if this request is sampled, else None."""
+    if not should_profile(forced):
+        return None
+    return RequestProfile(tag)
+
+
+class profile_request:
+    """``with profile_request("chat", forced=...):`` - profile the block if sampled."""
+    __slots__ = ("tag", "forced", "profile")
+
+    def __init__(self, tag, forced=False):
+        self.tag = tag
+        self.forced = forced
+        self.profile = None
+
+    def __enter__(self):
+        self.profile = start_request(self.tag, self.forced)
+        return self.profile
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.finish()
+        return False
@@ -0,0 +1,150 @@
+# registry.py - process-wide cache of loaded models
+#
+# Models are keyed by (real path, content hash). Every Streamlit session,
+# batch job or server handler that asks for the same file gets the same
+# object, so an extra session costs a dictionary entry rather than a model.
+# Files are opened with joblib's mmap_mode, which lets the numpy buffers in
+# the pickle be served from the OS page cache and shared across processes;
+# .hforest exports (healthai.export) are mapped directly, without pickle.
+#
+# When a file changes on disk the next lookup sees a new stat signature,
+# re-hashes it and loads the new version; the entry for the path is replaced
+# with one assignment, so callers get either the old or the new model and
+# never a half-loaded one. Old versions stay cached until evicted (LRU).
+import collections
+import hashlib
+import os
+import threading
+import time
+
+from .metrics import register_collector
+from .model import find_model_file, read_model
+
+DEFAULT_CAPACITY = 4
+
+
+class ModelEntry:
+    __slots__ = ("path", "name", "digest", "model", "size", "loaded_at", "load_seconds")
+
+    def __init__(self, path, digest, model, size, load_seconds):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.digest = digest
+        self.model = model
+        self.size = size
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+
+    @property
+    def key(self):
+        return (self.path, self.digest)
+
+    def __repr__(self):
+        return f"ModelEntry({self.name!r}, digest={self.digest[:12]})"
+
+
+def file_digest(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ModelRegistry:
+    """Bounded LRU of loaded models keyed by path plus content hash."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, mmap_mode='r'):
+        self.capacity = capacity
+        self.mmap_mode = mmap_mode
+        self._lock = threading.RLock()
+        self._models = collections.OrderedDict()   # (path, digest) -> ModelEntry
+        self._current = {}                         # path -> (stat signature, key)
+        self.hits = 0
+        self.misses = 0
+
+    def _resolve(self, path):
+        if path and path.strip():
+            return os.path.realpath(path.strip())
+        found = find_model_file()
+        if found is None:
+            raise FileNotFoundError("no model file found")
+        return os.path.realpath(found)
+
+    def _load(self, path, digest, size):
+        from .encoder import get_encoder
+
+        start = time.perf_counter()
+        model = read_model(path, mmap_mode=self.mmap_mode)
+        # A model fitted on other columns is refused here, not mis-scored later.
+        get_encoder().check_model(model)
+        return ModelEntry(path, digest, model, size, time.perf_counter() - start)
+
+    def get(self, path=None):
+        """Return the ``ModelEntry`` for the current contents of ``path``.
+
+        With no path the first model file in the working directory is used,
+        as ``load_model`` does. Raises ``FileNotFoundError``, whatever
+        joblib raises for unreadable files, or ``ValueError`` for a model
+        whose columns don't match the feature schema.
+        """
+        path = self._resolve(path)
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        with self._lock:
+            current = self._current.get(path)
+            if current and current[0] == signature and current[1] in self._models:
+                self._models.move_to_end(current[1])
+                self.hits += 1
+                return self._models[current[1]]
+
+            digest = file_digest(path)
+            key = (path, digest)
+            entry = self._models.get(key)
+            if entry is None:
+                self.misses += 1
+                entry = self._load(path, digest, st.st_size)
+                self._models[key] = entry
+                while len(self._models) > self.capacity:
+                    self._models.popitem(last=False)
+            else:
+                self.hits += 1
+                self._models.move_to_end(key)
+            self._current[path] = (signature, key)
+            return entry
+
+    def evict(self, path=None):
+        """Drop every cached version of ``path`` (or everything)."""
+        with self._lock:
+            if path is None:
+                self._models.clear()
+                self._current.clear()
+                return
+            path = os.path.realpath(path)
+            for key in [k for k in self._models if k[0] == path]:
+                del self._models[key]
+            self._current.pop(path, None)
+
+    def entries(self):
+        with self._lock:
+            return list(self._models.values())
+
+    def stats(self):
+        with self._lock:
+            return {"models": len(self._models), "capacity": self.capacity,
+                    "hits": self.hits, "misses": self.misses}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """The process-wide ``ModelRegistry``."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+                register_collector("model_registry", _registry.stats)
+    return _registry
@@ -0,0 +1,117 @@
+# rules.py - condition rules matched by symptom subset
+#
+# A rule fires when all of its symptoms are present in the input, whatever
+# else the patient reported. Every symptom seen in a rule gets one bit; a
+# rule is stored under the bitmask of its symptoms, so matching a message is
+# a walk over the submasks of the input's mask - 2**k dict lookups for k
+# recognized symptoms, independent of how many rules are loaded. Inputs with
+# many symptoms instead count hits through an inverted index (symptom bit ->
+# rules), whichever of the two touches fewer entries.
+import collections
+
+
+class Rule:
+    __slots__ = ("symptoms", "conditions", "severity", "order")
+
+    def __init__(self, symptoms, conditions, severity, order):
+        self.symptoms = symptoms
+        self.conditions = conditions
+        self.severity = severity
+        self.order = order
+
+    @property
+    def key(self):
+        return "+".join(sorted(self.symptoms))
+
+    def __repr__(self):
+        return f"Rule({self.key!r}, severity={self.severity})"
+
+
+def default_severity(symptoms, conditions):
+    """Rules naming an emergency outrank the rest. ``symptoms`` is part of
+    the ``severity`` callback signature and unused here; RuleEngine itself
+    ranks rules of equal severity by how many symptoms they name."""
+    return 1 + any("EMERGENCY" in c.upper() for c in conditions)
+
+
+class RuleEngine:
+    """Index of condition rules keyed like ``symptom_conditions`` ("a+b+c")."""
+
+    def __init__(self, rules=None, severity=default_severity):
+        self._severity = severity
+        self._bits = {}                               # symptom -> bit
+        self._by_mask = {}                            # mask -> [Rule]
+        self._postings = collections.defaultdict(list)  # bit index -> [(mask, size)]
+        self._count = 0
+        for key, conditions in (rules or {}).items():
+            self.add(key.split("+"), conditions)
+
+    def __len__(self):
+        return self._count
+
+    def add(self, symptoms, conditions, severity=None):
+        names = frozenset(s.strip().lower() for s in symptoms if s.strip())
+        if not names:
+            raise ValueError("a rule needs at least one symptom")
+        conditions = list(conditions)
+        if severity is None:
+            severity = self._severity(names, conditions)
+        mask = 0
+        for name in names:
+            bit = self._bits.get(name)
+            if bit is None:
+                bit = self._bits[name] = len(self._bits)
+            mask |= 1 << bit
+        rules = self._by_mask.get(mask)
+        if rules is None:
+            rules = self._by_mask[mask] = []
+            for name in names:
+                self._postings[self._bits[name]].append((mask, len(names)))
+        rule = Rule(names, conditions, severity, self._count)
+        rules.append(rule)
+        self._count += 1
+        return rule
+
+    def mask(self, symptoms):
+        """Bitmask of the input's symptoms; ones no rule mentions are ignored."""
+        mask = 0
+        for bit in self._bits_of(symptoms):
+            mask |= 1 << bit
+        return mask
+
+    def _bits_of(self, symptoms):
+        bits = self._bits
+        return {bits[s] for s in symptoms if s in bits}
+
+    def match(self, symptoms):
+        """Every rule whose symptoms are all in ``symptoms``, most severe first
+        (then most specific, then definition order)."""
+        bits = self._bits_of(symptoms)
+        if not bits:
+            return []
+        by_mask = self._by_mask
+        matched = []
+        if len(bits) <= 8 or 1 << len(bits) <= sum(len(self._postings[b]) for b in bits):
+            mask = 0
+            for bit in bits:
+                mask |= 1 << bit
+            sub = mask
+            while sub:
+                rules = by_mask.get(sub)
+                if rules:
+                    matched.extend(rules)
+                sub = (sub - 1) & mask
+        else:
+            hits = collections.Counter()
+            for bit in bits:
+                hits.update(self._postings[bit])
+            for (rule_mask, size), n in hits.items():
+                if n == size:
+                    matched.extend(by_mask[rule_mask])
+        if len(matched) > 1:
+            matched.sort(key=lambda r: (-r.severity, -len(r.symptoms), r.order))
+        return matched
+
+    def conditions(self, symptoms):
+        """Matched conditions in rank order, without duplicates."""
+        return list(dict.fromkeys(c for rule in self.match(symptoms) for c in rule.conditions))
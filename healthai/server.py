@@ -0,0 +1,346 @@
+# server.py - asyncio JSON/HTTP service for the chatbot, symptom checker,
+# drug lookup and heart-risk predictor
+#
+# Usage:
+#   python -m healthai.server --port 8000 --batch-wait-ms 2 --max-batch 256
+#
+# Endpoints (all JSON):
+#   GET  /health
+#   POST /chat      {"message": "..."}                    -> {"response": "..."}
+#   POST /symptoms  {"symptoms": "fever, cough" | [...]}  -> analyze_symptoms() result
+#   GET  /drugs?q=aspirin  or  POST /drugs {"query": ...} -> get_drug_info() result
+#   POST /predict   {"features": [13 encoded values]}     -> predict_risk() result
+#                   or {"patient": {"age": 50, "sex": "Male", ...}} (UI labels)
+#   GET  /metrics   Prometheus text format (see healthai.metrics)
+#
+# /chat and /symptoms take ?stream=1 to answer with chunked NDJSON instead,
+# one line per section as it is ready - urgency first, so an emergency is
+# in the first line: {"section": "..."} for chat, {"<field>": value} for
+# symptoms (message parts are to be concatenated).
+#
+# Any request may add ?profile=1 to have its stacks sampled into a
+# collapsed-stack file (see healthai.profiling; HEALTHAI_PROFILE samples a
+# fraction of all requests). Samples come from the event-loop thread, so
+# they include whatever else the loop ran meanwhile.
+#
+# Everything is served from one process-wide chatbot and one registry model.
+# Predictions go through a MicroBatcher: concurrent requests are merged into
+# a single predict_proba call that runs on its thread pool, off the event loop.
+# Other blocking work - the registry's stat/hash/load of the model file,
+# compiling it, and the prediction cache's SQLite store - runs on the loop's
+# default executor, so a model swap or a slow disk doesn't stall connections.
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from .batching import MicroBatcher
+from .cache import get_prediction_cache
+from .chatbot import get_chatbot
+from .forest import compile_forest
+from . import metrics, profiling
+from .encoder import get_encoder
+from .model import FEATURE_NAMES, encode_features
+from .registry import get_registry
+
+MAX_BODY = 1 << 20
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# -------------------------
+# Request handling
+# -------------------------
+class HealthAIServer:
+    def __init__(self, model_path=None, workers=4, max_batch=256, batch_wait_ms=2.0, use_cache=True,
+                 compiled=False, collect_metrics=True):
+        if collect_metrics:
+            metrics.enable()
+        self.model_path = model_path
+        self.compiled = compiled
+        self._compiled = {}
+        self._compiled_lock = threading.Lock()
+        self.chatbot = get_chatbot()
+        self.registry = get_registry()
+        self.cache = get_prediction_cache() if use_cache else None
+        self.batcher = MicroBatcher(max_batch, batch_wait_ms, workers)
+        metrics.register_collector("micro_batcher", self.batcher.metrics)
+        self.started = time.time()
+        self.requests = 0
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("POST", "/chat"): self.chat,
+            ("POST", "/symptoms"): self.symptoms,
+            ("GET", "/drugs"): self.drugs,
+            ("POST", "/drugs"): self.drugs,
+            ("POST", "/predict"): self.predict,
+            ("GET", "/metrics"): self.prometheus,
+        }
+
+    # --- handlers -------------------------------------------------------
+    async def health(self, body, query):
+        try:
+            entry = await _blocking(self.registry.get, self.model_path)
+            model = {"name": entry.name, "digest": entry.digest}
+        except Exception as e:
+            model = {"error": str(e)}
+        return {"status": "ok", "uptime": time.time() - self.started, "requests": self.requests,
+                "model": model, "cache": self.cache.stats() if self.cache else None,
+                "batching": self.batcher.metrics()}
+
+    async def prometheus(self, body, query):
+        return metrics.get_metrics().render_prometheus()
+
+    async def chat(self, body, query):
+        message = _field(body, "message", str)
+        if _streaming(query):
+            return ({"section": section} async for section in self.chatbot.astream_response(message))
+        return {"response": self.chatbot.generate_response(message)}
+
+    async def symptoms(self, body, query):
+        symptoms = _field(body, "symptoms", (str, list))
+        if _streaming(query):
+            return ({field: value} async for field, value in self.chatbot.astream_symptoms(symptoms))
+        return self.chatbot.analyze_symptoms(symptoms)
+
+    async def drugs(self, body, query):
+        q = query.get("q", [""])[0] if body is None else _field(body, "query", str)
+        if not q.strip():
+            raise HTTPError(400, "missing drug query")
+        return {"query": q, "result": self.chatbot.get_drug_info(q)}
+
+    async def predict(self, body, query):
+        features = _parse_features(body)
+        try:
+            entry, model = await _blocking(self._scoring_model)
+        except Exception as e:
+            raise HTTPError(503, f"model unavailable: {e}")
+        if self.cache is not None:
+            cached = await self._cache_call(self.cache.get, entry.digest, features)
+            if cached is not None:
+                return cached
+        result = await self.batcher.predict_async(model, features)
+        if self.cache is not None:
+            await self._cache_call(self.cache.put, entry.digest, features, result)
+        return result
+
+    def _scoring_model(self):
+        """``(entry, model to score with)`` for the current model file. Blocking."""
+        entry = self.registry.get(self.model_path)
+        if not self.compiled:
+            return entry, entry.model
+        with self._compiled_lock:
+            compiled = self._compiled.get(entry.digest)
+            if compiled is None:
+                compiled = self._compiled[entry.digest] = compile_forest(entry.model)
+                # keep only the current version
+                for digest in [d for d in self._compiled if d != entry.digest]:
+                    del self._compiled[digest]
+        return entry, compiled
+
+    async def _cache_call(self, fn, *args):
+        # Memory-only lookups are dict operations; only the SQLite store blocks.
+        if self.cache.path:
+            return await _blocking(fn, *args)
+        return fn(*args)
+
+    # --- HTTP plumbing ----------------------------------------------------
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not request_line:
+                    break
+                keep_alive = await self._handle_request(request_line, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, request_line, reader, writer):
+        # Until the headers and body are read in full, an error leaves the
+        # stream at an unknown position: the connection is closed after it.
+        status, payload, keep_alive = 200, None, False
+        try:
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                raise HTTPError(400, "malformed request line")
+            headers = {}
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:   # longer than the stream limit
+                    raise HTTPError(400, "header line too long")
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = headers.get("content-length") or "0"
+            if not length.isdecimal():
+                raise HTTPError(400, "invalid Content-Length")
+            length = int(length)
+            if length > MAX_BODY:
+                raise HTTPError(413, "request body too large")
+            raw = await reader.readexactly(length) if length else b""
+            keep_alive = (headers.get("connection", "").lower() != "close"
+                          and version.upper() == "HTTP/1.1")
+
+            url = urlsplit(target)
+            handler = self.routes.get((method.upper(), url.path))
+            if handler is None:
+                if any(path == url.path for _, path in self.routes):
+                    raise HTTPError(405, f"{method} not allowed on {url.path}")
+                raise HTTPError(404, f"no route for {url.path}")
+            body = None
+            if method.upper() == "POST":
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    raise HTTPError(400, "body is not valid JSON")
+                if not isinstance(body, dict):
+                    raise HTTPError(400, "body must be a JSON object")
+            self.requests += 1
+            query = parse_qs(url.query)
+            forced = profiling.is_forced(query.get("profile", [""])[0])
+            with metrics.timer(f"http {url.path}"), profiling.profile_request(f"http{url.path}", forced):
+                payload = await handler(body, query)
+                if hasattr(payload, "__anext__"):
+                    # A streamed reply is computed while it is written, so it
+                    # is timed and profiled until its last line is sent.
+                    return await self._write_stream(writer, payload, keep_alive)
+        except HTTPError as e:
+            status, payload = e.status, {"error": str(e)}
+        except asyncio.IncompleteReadError:
+            status, payload, keep_alive = 400, {"error": "truncated request body"}, False
+        except ConnectionError:
+            raise
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        if isinstance(payload, str):
+            data, content_type = payload.encode(), metrics.PROMETHEUS_CONTENT_TYPE
+        else:
+            data, content_type = json.dumps(payload).encode(), "application/json"
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+        return keep_alive
+
+    @staticmethod
+    async def _write_stream(writer, lines, keep_alive):
+        writer.write(
+            f"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode())
+        try:
+            async for line in lines:
+                data = json.dumps(line).encode() + b"\n"
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+        except ConnectionError:
+            raise
+        except Exception as e:
+            # Headers are gone; the error becomes the stream's last line.
+            data = json.dumps({"error": f"{type(e).__name__}: {e}"}).encode() + b"\n"
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        writer.write(b"0\r\n\r\n")
+        return keep_alive
+
+    async def serve(self, host="127.0.0.1", port=8000, ready=None):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        if ready:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.batcher.close()
+
+
+async def _blocking(fn, *args):
+    """Run ``fn(*args)`` on the event loop's default executor."""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def _field(body, name, types):
+    value = body.get(name)
+    if not isinstance(value, types):
+        raise HTTPError(400, f"missing or invalid field {name!r}")
+    return value
+
+
+def _streaming(query):
+    return query.get("stream", [""])[0].lower() in ("1", "true", "yes", "on")
+
+
+def _parse_features(body):
+    if "features" in body:
+        features = body["features"]
+        if (not isinstance(features, list) or len(features) != len(FEATURE_NAMES)
+                or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in features)):
+            raise HTTPError(400, f"'features' must be a list of {len(FEATURE_NAMES)} numbers in order {FEATURE_NAMES}")
+        try:
+            return get_encoder().encode_values(*features)
+        except ValueError as e:
+            raise HTTPError(400, f"invalid features: {e}")
+    patient = body.get("patient")
+    if isinstance(patient, dict):
+        try:
+            return encode_features(**patient)
+        except (TypeError, ValueError) as e:
+            raise HTTPError(400, f"invalid patient record: {e}")
+    raise HTTPError(400, "expected 'features' or 'patient'")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m healthai.server",
+                                 description="Serve the HealthAI chatbot and predictor over HTTP/JSON.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("-m", "--model", help="model file (default: auto-detect in the current directory)")
+    ap.add_argument("--workers", type=int, default=4, help="inference threads")
+    ap.add_argument("--max-batch", type=int, default=256, help="max rows merged into one predict_proba call")
+    ap.add_argument("--batch-wait-ms", type=float, default=2.0, help="how long to wait for more rows")
+    ap.add_argument("--no-cache", action="store_true", help="disable the prediction cache")
+    ap.add_argument("--compiled", action="store_true",
+                    help="score with the flat-array CompiledForest (faster for small batches)")
+    ap.add_argument("--no-metrics", action="store_true", help="do not time requests (GET /metrics stays up)")
+    args = ap.parse_args(argv)
+
+    app = HealthAIServer(args.model, args.workers, args.max_batch, args.batch_wait_ms,
+                         use_cache=not args.no_cache, compiled=args.compiled,
+                         collect_metrics=not args.no_metrics)
+    try:
+        app.registry.get(args.model)  # load before accepting traffic
+    except Exception as e:
+        print(f"warning: model not loaded: {e}", file=sys.stderr)
+
+    def ready(server):
+        addr = server.sockets[0].getsockname()
+        print(f"HealthAI service listening on http://{addr[0]}:{addr[1]}", file=sys.stderr)
+
+    try:
+        asyncio.run(app.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
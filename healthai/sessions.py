@@ -0,0 +1,214 @@
+# sessions.py - per-session state with memory budgets for multi-tenant serving
+#
+# Every browser session's chat history lives in one process-wide SessionStore,
+# keyed by a session id the app keeps in st.session_state. Sessions hold no
+# model: they keep only the registry path, so the per-session cost is the
+# chat history. Two budgets keep it bounded:
+#
+#   - per session: after each request a session over ``session_budget`` bytes
+#     first drops the cached HTML of turns outside the visible window, then
+#     spills its oldest turns to its JSONL file (ChatHistory.compact) until
+#     it fits;
+#   - global: while all sessions together exceed ``global_budget``, the
+#     sessions idle for ``idle_seconds`` or more are compacted whole - every
+#     turn on disk, nothing in memory - least recently used first; if that
+#     is not enough, idle sessions are evicted in the same order, spill
+#     files and all, until the rest fits.
+#
+# Sessions untouched for ``ttl`` seconds are dropped with their spill files.
+import collections
+import os
+import sys
+import threading
+import time
+import uuid
+
+from .history import DEFAULT_CAPACITY, ChatHistory
+from .metrics import register_collector
+
+DEFAULT_SESSION_BUDGET = 256 * 1024
+DEFAULT_GLOBAL_BUDGET = 64 * 1024 * 1024
+DEFAULT_IDLE_SECONDS = 300
+DEFAULT_TTL = 24 * 3600
+DEFAULT_VISIBLE = 20
+
+
+class Session:
+    __slots__ = ("session_id", "history", "created", "last_seen", "nbytes", "compactions")
+
+    def __init__(self, session_id, history, now):
+        self.session_id = session_id
+        self.history = history
+        self.created = now
+        self.last_seen = now
+        self.nbytes = 0
+        self.compactions = 0
+
+    def measure(self):
+        self.nbytes = sys.getsizeof(self) + self.history.memory_bytes()
+        return self.nbytes
+
+
+class SessionStore:
+    """LRU of ``Session`` records under a per-session and a global memory budget.
+
+    ``get`` opens (or resumes) a session at the start of a request and
+    ``release`` accounts for it at the end; budgets are enforced in
+    ``release``, so a session is never compacted while its request runs.
+    ``visible`` turns per session keep their cached HTML. Counters:
+    ``compactions`` (per-session budget), ``spills`` and ``evictions``
+    (sessions compacted whole and dropped for the global budget) and
+    ``expired`` (ttl).
+    """
+
+    def __init__(self, session_budget=DEFAULT_SESSION_BUDGET, global_budget=DEFAULT_GLOBAL_BUDGET,
+                 idle_seconds=DEFAULT_IDLE_SECONDS, ttl=DEFAULT_TTL, capacity=DEFAULT_CAPACITY,
+                 visible=DEFAULT_VISIBLE, spill_dir=None):
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self.idle_seconds = idle_seconds
+        self.ttl = ttl
+        self.capacity = capacity
+        self.visible = visible
+        self.spill_dir = spill_dir
+        self._sessions = collections.OrderedDict()   # session_id -> Session, least recent first
+        self._lock = threading.Lock()
+        self._total = 0
+        self.compactions = self.spills = self.evictions = self.expired = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def get(self, session_id=None):
+        """The session for ``session_id`` (a new one if unknown or None),
+        marked as most recently used."""
+        now = int(time.time())
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session_id = session_id or uuid.uuid4().hex
+                history = ChatHistory(self.capacity, self.spill_dir, session_id)
+                session = self._sessions[session_id] = Session(session_id, history, now)
+            else:
+                self._sessions.move_to_end(session_id)
+                session.last_seen = now
+            return session
+
+    def release(self, session):
+        """Account for ``session`` after a request and enforce the budgets."""
+        now = int(time.time())
+        with self._lock:
+            session.last_seen = now
+            if self._sessions.get(session.session_id) is not session:
+                return   # dropped while the request ran
+            self._total -= session.nbytes
+            if session.measure() > self.session_budget:
+                self._fit(session)
+            self._total += session.nbytes
+            self._expire(now)
+            if self._total > self.global_budget:
+                self._evict(now, session)
+
+    def _fit(self, session):
+        history = session.history
+        history.drop_html(keep=self.visible)
+        keep = history.in_memory
+        while session.measure() > self.session_budget and keep > 0:
+            keep //= 2
+            history.compact(keep)
+        session.compactions += 1
+        self.compactions += 1
+
+    def _expire(self, now):
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen < self.ttl:
+                break
+            self._drop(session)
+            self.expired += 1
+
+    def _evict(self, now, current):
+        # Least recently used first; the LRU order is also last_seen order,
+        # so the first session that isn't idle ends the scan.
+        idle = []
+        for session in self._sessions.values():
+            if now - session.last_seen < self.idle_seconds:
+                break
+            idle.append(session)
+        for session in idle:
+            if self._total <= self.global_budget:
+                return
+            if session.history.in_memory:
+                self._total -= session.nbytes
+                session.history.compact()
+                self._total += session.measure()
+                self.spills += 1
+        # Compacted sessions still cost their records and spill offsets; drop
+        # them, but never the session whose request is being released.
+        for session in idle:
+            if self._total <= self.global_budget:
+                return
+            if session is not current:
+                self._drop(session)
+                self.evictions += 1
+
+    def _drop(self, session):
+        del self._sessions[session.session_id]
+        self._total -= session.nbytes
+        session.history.clear()
+
+    def drop(self, session_id):
+        """Forget a session and delete its spill file."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._drop(session)
+
+    def memory_bytes(self):
+        """Accounted bytes of all sessions, as of their last ``release``."""
+        return self._total
+
+    def report(self):
+        """One row per session, most recently used first, for diagnostics."""
+        now = int(time.time())
+        with self._lock:
+            sessions = list(reversed(self._sessions.values()))
+        return [{"session": s.session_id[:8], "turns": len(s.history), "in memory": s.history.in_memory,
+                 "spilled": s.history.spilled, "KB": round(s.nbytes / 1024, 1),
+                 "idle s": now - s.last_seen, "compactions": s.compactions} for s in sessions]
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "bytes": self._total,
+                    "session_budget": self.session_budget, "global_budget": self.global_budget,
+                    "compactions": self.compactions, "spills": self.spills, "evictions": self.evictions,
+                    "expired": self.expired}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Process-wide store. ``HEALTHAI_SESSION_BUDGET_KB`` and
+    ``HEALTHAI_SESSIONS_BUDGET_MB`` set the budgets, ``HEALTHAI_SESSION_IDLE_S``
+    and ``HEALTHAI_SESSION_TTL_S`` the idle time before compaction or eviction
+    and before expiry,
+    ``HEALTHAI_CHAT_CAPACITY`` the turns a session may keep in memory."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                env = os.environ.get
+                _store = SessionStore(
+                    session_budget=int(float(env("HEALTHAI_SESSION_BUDGET_KB", DEFAULT_SESSION_BUDGET / 1024)) * 1024),
+                    global_budget=int(float(env("HEALTHAI_SESSIONS_BUDGET_MB", DEFAULT_GLOBAL_BUDGET / 2 ** 20))
+                                      * 2 ** 20),
+                    idle_seconds=float(env("HEALTHAI_SESSION_IDLE_S", DEFAULT_IDLE_SECONDS)),
+                    ttl=float(env("HEALTHAI_SESSION_TTL_S", DEFAULT_TTL)),
+                    capacity=int(env("HEALTHAI_CHAT_CAPACITY", DEFAULT_CAPACITY)))
+                register_collector("sessions", _store.stats)
+    return _store
@@ -0,0 +1,150 @@
+# text.py - compiled phrase matching shared by the chatbot modules
+import re
+
+_WORD_BOUNDARY = re.compile(r"\b")
+
+
+def _trie_pattern(phrases):
+    """Build a regex alternation shaped like a character trie.
+
+    Shared prefixes are factored out so the engine walks each input
+    character once per start position instead of once per phrase.
+    Optional tails are greedy, so the longest phrase is tried first.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def walk(node):
+        branches = [re.escape(ch) + walk(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            body = "(?:" + body + ")?"
+        return body
+
+    return walk(trie)
+
+
+class PhraseMatcher:
+    """Finds every whole-word phrase of a fixed vocabulary in one pass.
+
+    Gives the same result as a separate whole-word ``re.search`` per phrase,
+    but the pattern is compiled once. Results come back deduplicated and in
+    vocabulary order.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(dict.fromkeys(phrases))
+        self._rank = {p: i for i, p in enumerate(self.phrases)}
+        # A lookahead match at a word start only reports the longest phrase
+        # there; shorter phrases that are whole-word prefixes of it start at
+        # the same position and are added from this table.
+        self._prefixes = {}
+        for p in self.phrases:
+            shorter = [p[:m.start()] for m in _WORD_BOUNDARY.finditer(p)
+                       if 0 < m.start() < len(p) and p[:m.start()] in self._rank]
+            if shorter:
+                self._prefixes[p] = shorter
+        if self.phrases:
+            self._regex = re.compile(r"\b(?=(" + _trie_pattern(self.phrases) + r")\b)")
+        else:
+            self._regex = None
+
+    def finditer(self, text):
+        """Yield ``(start, phrase)`` for the longest phrase at each word start, in text order."""
+        if not text or self._regex is None:
+            return
+        for m in self._regex.finditer(text):
+            yield m.start(), m.group(1)
+
+    def find_first(self, text):
+        """Leftmost (and, at that position, longest) phrase in ``text``, or None."""
+        return next((phrase for _, phrase in self.finditer(text)), None)
+
+    def find_all(self, text):
+        if not text or self._regex is None:
+            return []
+        found = set()
+        for m in self._regex.finditer(text):
+            phrase = m.group(1)
+            found.add(phrase)
+            found.update(self._prefixes.get(phrase, ()))
+        return sorted(found, key=self._rank.__getitem__)
+
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def tokenize(text):
+    """Words and single punctuation marks of ``text``; whitespace is dropped."""
+    tokens = text.split()
+    if all(map(str.isalnum, tokens)):
+        return tokens
+    out = []
+    for token in tokens:
+        if token.isalnum():
+            out.append(token)
+        else:
+            out += _TOKEN.findall(token)
+    return out
+
+
+class TokenMatcher:
+    """Whole-word phrase lookup over a token list.
+
+    Phrases are stored in a trie keyed by token, so a text is matched with
+    one ``tokenize`` call and, per token, a walk only as deep as the phrases
+    starting there, no matter how large the vocabulary. Phrases separated
+    by different amounts of whitespace in the text still match.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(dict.fromkeys(phrases))
+        self._rank = {p: i for i, p in enumerate(self.phrases)}
+        self._trie = {}
+        for phrase in self.phrases:
+            tokens = tokenize(phrase)
+            if not tokens:
+                continue
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(None, []).append(phrase)   # tokens are never None
+
+    def finditer(self, tokens):
+        """Yield ``(token_index, phrase)`` for every phrase in ``tokens``, in
+        text order; at one position longer phrases come first."""
+        trie = self._trie
+        if trie.keys().isdisjoint(tokens):
+            return
+        n = len(tokens)
+        for i, token in enumerate(tokens):
+            node = trie.get(token)
+            if node is None:
+                continue
+            ends = []
+            j = i + 1
+            while True:
+                if None in node:
+                    ends.append(node[None])
+                if j == n:
+                    break
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+            for phrases in reversed(ends):
+                for phrase in phrases:
+                    yield i, phrase
+
+    def find_all(self, text):
+        """Every phrase in ``text``, deduplicated and in vocabulary order."""
+        if not text:
+            return []
+        found = {phrase for _, phrase in self.finditer(tokenize(text))}
+        return sorted(found, key=self._rank.__getitem__)
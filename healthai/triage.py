@@ -0,0 +1,211 @@
+# triage.py - bulk offline triage of chat / symptom logs
+#
+# Usage:
+#   python -m healthai.triage messages.jsonl -o triaged.jsonl --workers 0
+#   python -m healthai.triage messages.jsonl -o triaged.jsonl --resume
+#
+# Input is JSONL (one object per line) or CSV with a text column; records are
+# read through a generator, cut into chunks and triaged with the chatbot's
+# own rules (HealthcareChatbot.triage). Results are appended to the output in
+# input order as each chunk finishes, so memory is bounded by the chunks in
+# flight. After every chunk a small checkpoint next to the output records
+# how many input records are done and how long the output was at that point;
+# --resume truncates the output back to it and skips the finished records.
+import argparse
+import collections
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .chatbot import HealthcareChatbot, get_chatbot
+
+DEFAULT_CHUNKSIZE = 2_000
+OUTPUT_FIELDS = ("id", "urgency", "matched", "recommendations")
+
+_worker_bot = None
+
+
+def _is_jsonl(path):
+    return path.lower().endswith(('.jsonl', '.ndjson', '.json'))
+
+
+def iter_messages(path, text_field="message", id_field="id"):
+    """Yield ``(id, text)`` for every record of a JSONL or CSV file.
+
+    Records without an id get their 0-based position. The text may also be a
+    JSON list of symptoms.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if _is_jsonl(path):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+        for i, record in enumerate(records):
+            yield record.get(id_field, i), record.get(text_field) or ""
+
+
+def iter_chunks(records, chunksize):
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def triage_chunk(chunk, bot=None):
+    bot = bot or _worker_bot or get_chatbot()
+    triage = bot.triage
+    return [{"id": msg_id, **triage(text)} for msg_id, text in chunk]
+
+
+def _init_worker(kb):
+    global _worker_bot
+    _worker_bot = HealthcareChatbot(kb=kb)
+
+
+class _ResultWriter:
+    """Append-only JSONL or CSV writer that can report and restore its length."""
+
+    def __init__(self, path, truncate_to=None):
+        self.path = path
+        self._jsonl = _is_jsonl(path)
+        if truncate_to is None:
+            self._f = open(path, 'w', newline='', encoding='utf-8')
+        else:
+            self._f = open(path, 'r+', newline='', encoding='utf-8')
+            self._f.truncate(truncate_to)
+            self._f.seek(truncate_to)
+        self._csv = None
+        if not self._jsonl:
+            self._csv = csv.writer(self._f)
+            if truncate_to in (None, 0):
+                self._csv.writerow(OUTPUT_FIELDS)
+
+    def write(self, results):
+        if self._jsonl:
+            self._f.writelines(json.dumps(r) + "\n" for r in results)
+        else:
+            self._csv.writerows((r["id"], r["urgency"], "; ".join(r["matched"]), "; ".join(r["recommendations"]))
+                                for r in results)
+
+    def flush(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        return self._f.tell()
+
+    def close(self):
+        self._f.close()
+
+
+def checkpoint_path(output_path):
+    return output_path + ".ckpt"
+
+
+def _read_checkpoint(input_path, output_path):
+    try:
+        with open(checkpoint_path(output_path), encoding='utf-8') as f:
+            ckpt = json.load(f)
+    except FileNotFoundError:
+        return None
+    if ckpt.get("input") != os.path.abspath(input_path):
+        raise ValueError(f"checkpoint for {output_path} belongs to {ckpt.get('input')}")
+    return ckpt
+
+
+def _write_checkpoint(output_path, ckpt):
+    tmp = checkpoint_path(output_path) + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(ckpt, f)
+    os.replace(tmp, checkpoint_path(output_path))
+
+
+def triage_file(input_path, output_path, workers=1, chunksize=DEFAULT_CHUNKSIZE, resume=False,
+                text_field="message", id_field="id", kb=None, progress=None):
+    """Triage every record of ``input_path`` into ``output_path`` (JSONL or CSV
+    by extension).
+
+    ``workers`` > 1 fans chunks out over that many processes (0 = one per
+    core), keeping at most ``2 * workers`` chunks in flight. ``kb`` is a
+    knowledge-base path for the worker chatbots. Returns stats including
+    ``messages_per_sec`` and ``messages_per_sec_per_core``.
+    """
+    workers = workers or os.cpu_count() or 1
+    ckpt = _read_checkpoint(input_path, output_path) if resume else None
+    done = ckpt["records"] if ckpt else 0
+    writer = _ResultWriter(output_path, truncate_to=ckpt["output_bytes"] if ckpt else None)
+    stats = {"messages": 0, "resumed_from": done, "chunks": 0, "urgency": collections.Counter(),
+             "workers": workers, "seconds": 0.0, "messages_per_sec": 0.0, "messages_per_sec_per_core": 0.0}
+    start = time.perf_counter()
+
+    def commit(results):
+        nonlocal done
+        writer.write(results)
+        done += len(results)
+        _write_checkpoint(output_path, {"input": os.path.abspath(input_path), "records": done,
+                                        "output_bytes": writer.flush()})
+        stats["messages"] += len(results)
+        stats["chunks"] += 1
+        stats["urgency"].update(r["urgency"] for r in results)
+        stats["seconds"] = time.perf_counter() - start
+        stats["messages_per_sec"] = stats["messages"] / stats["seconds"] if stats["seconds"] else 0.0
+        stats["messages_per_sec_per_core"] = stats["messages_per_sec"] / workers
+        if progress:
+            progress(stats)
+
+    chunks = iter_chunks(itertools.islice(iter_messages(input_path, text_field, id_field), done, None), chunksize)
+    try:
+        if workers == 1:
+            bot = HealthcareChatbot(kb=kb) if kb else get_chatbot()
+            for chunk in chunks:
+                commit(triage_chunk(chunk, bot))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(kb,),
+                                     mp_context=multiprocessing.get_context()) as pool:
+                pending = collections.deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(triage_chunk, chunk))
+                    if len(pending) >= 2 * workers:
+                        commit(pending.popleft().result())
+                while pending:
+                    commit(pending.popleft().result())
+    finally:
+        writer.close()
+    stats["urgency"] = dict(stats["urgency"])
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m healthai.triage",
+                                 description="Triage a JSONL/CSV message log with the chatbot's symptom rules.")
+    ap.add_argument("input", help="JSONL or CSV file with one message per record")
+    ap.add_argument("-o", "--output", required=True, help="where to write results (.jsonl or .csv)")
+    ap.add_argument("-w", "--workers", type=int, default=1, help="worker processes (0 = one per core)")
+    ap.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="messages per chunk")
+    ap.add_argument("--text-field", default="message", help="field/column holding the message")
+    ap.add_argument("--id-field", default="id", help="field/column holding the record id")
+    ap.add_argument("--kb", default=os.environ.get("HEALTHAI_KB") or None, help="knowledge base file")
+    ap.add_argument("--resume", action="store_true", help="continue from the output's checkpoint")
+    ap.add_argument("-q", "--quiet", action="store_true", help="only print the final summary")
+    args = ap.parse_args(argv)
+
+    def progress(stats):
+        print(f"  {stats['resumed_from'] + stats['messages']:>12,} messages  "
+              f"{stats['messages_per_sec']:>10,.0f} msg/s", file=sys.stderr)
+
+    stats = triage_file(args.input, args.output, args.workers, args.chunksize, args.resume,
+                        args.text_field, args.id_field, args.kb, progress=None if args.quiet else progress)
+    print(f"Triaged {stats['messages']:,} messages from {os.path.basename(args.input)} "
+          f"in {stats['seconds']:.2f}s with {stats['workers']} worker(s): "
+          f"{stats['messages_per_sec']:,.0f} msg/s, {stats['messages_per_sec_per_core']:,.0f} msg/s per core "
+          f"({', '.join(f'{k} {v:,}' for k, v in sorted(stats['urgency'].items()))})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())